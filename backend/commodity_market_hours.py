@@ -3,12 +3,23 @@ Commodity Market Hours Manager
 Verwaltet individuelle Handelszeiten für jedes Asset/Commodity
 """
 
-from datetime import datetime, timezone, time
-from typing import Dict, List, Optional
+import asyncio
+from collections import ChainMap
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from time import monotonic
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Beschreibungen der Zeitplan-Klassen (von allen Commodities einer Klasse geteilt)
+DESCRIPTION_24_5 = "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+DESCRIPTION_EXCHANGE = "Montag-Freitag 08:30-20:00 UTC"
+DESCRIPTION_24_7 = "24/7 - Immer geöffnet"
+
 # Default Handelszeiten für alle Commodities
 DEFAULT_MARKET_HOURS = {
     # Edelmetalle - 24/5 (Sonntag 22:00 - Freitag 21:00 UTC)
@@ -18,7 +29,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",  # UTC
         "close_time": "21:00",  # UTC
         "is_24_5": True,  # Öffnet Sonntag Abend, schließt Freitag Abend
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     "SILVER": {
         "enabled": True,
@@ -26,7 +37,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     "PLATINUM": {
         "enabled": True,
@@ -34,7 +45,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     "PALLADIUM": {
         "enabled": True,
@@ -42,7 +53,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     
     # Energie - 24/5
@@ -52,7 +63,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     "BRENT_CRUDE": {
         "enabled": True,
@@ -60,7 +71,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     "NATURAL_GAS": {
         "enabled": True,
@@ -68,7 +79,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     
     # Industriemetalle - 24/5
@@ -78,7 +89,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     
     # Agrar - Börsenzeiten (Montag-Freitag 08:30-20:00 UTC)
@@ -88,7 +99,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "08:30",
         "close_time": "20:00",
         "is_24_5": False,
-        "description": "Montag-Freitag 08:30-20:00 UTC"
+        "description": DESCRIPTION_EXCHANGE
     },
     "CORN": {
         "enabled": True,
@@ -96,7 +107,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "08:30",
         "close_time": "20:00",
         "is_24_5": False,
-        "description": "Montag-Freitag 08:30-20:00 UTC"
+        "description": DESCRIPTION_EXCHANGE
     },
     "SOYBEANS": {
         "enabled": True,
@@ -104,7 +115,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "08:30",
         "close_time": "20:00",
         "is_24_5": False,
-        "description": "Montag-Freitag 08:30-20:00 UTC"
+        "description": DESCRIPTION_EXCHANGE
     },
     "COFFEE": {
         "enabled": True,
@@ -112,7 +123,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "08:30",
         "close_time": "20:00",
         "is_24_5": False,
-        "description": "Montag-Freitag 08:30-20:00 UTC"
+        "description": DESCRIPTION_EXCHANGE
     },
     "SUGAR": {
         "enabled": True,
@@ -120,7 +131,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "08:30",
         "close_time": "20:00",
         "is_24_5": False,
-        "description": "Montag-Freitag 08:30-20:00 UTC"
+        "description": DESCRIPTION_EXCHANGE
     },
     "COCOA": {
         "enabled": True,
@@ -128,7 +139,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "08:30",
         "close_time": "20:00",
         "is_24_5": False,
-        "description": "Montag-Freitag 08:30-20:00 UTC"
+        "description": DESCRIPTION_EXCHANGE
     },
     
     # Forex - 24/5
@@ -138,7 +149,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     "GBPUSD": {
         "enabled": True,
@@ -146,7 +157,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     "USDJPY": {
         "enabled": True,
@@ -154,7 +165,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "22:00",
         "close_time": "21:00",
         "is_24_5": True,
-        "description": "24/5 - Sonntag 22:00 bis Freitag 21:00 UTC"
+        "description": DESCRIPTION_24_5
     },
     
     # Crypto - 24/7
@@ -164,7 +175,7 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "00:00",
         "close_time": "23:59",
         "is_24_7": True,
-        "description": "24/7 - Immer geöffnet"
+        "description": DESCRIPTION_24_7
     },
     "ETHEREUM": {
         "enabled": True,
@@ -172,12 +183,253 @@ DEFAULT_MARKET_HOURS = {
         "open_time": "00:00",
         "close_time": "23:59",
         "is_24_7": True,
-        "description": "24/7 - Immer geöffnet"
+        "description": DESCRIPTION_24_7
     }
 }
 
 
-def is_market_open(commodity_id: str, market_hours: Optional[Dict] = None, current_time: Optional[datetime] = None) -> bool:
+# Schedule-Typen (kind) für die kompakte Darstellung der Handelszeiten
+KIND_NORMAL = 0  # Börsenzeiten an bestimmten Tagen (Agrar, Aktien)
+KIND_24_5 = 1    # Sonntag Abend bis Freitag Abend (Forex, Metalle, Energie)
+KIND_24_7 = 2    # Immer geöffnet (Crypto)
+
+# 24/5 Märkte: Montag (Bit 0) bis Donnerstag (Bit 3) ganztägig offen
+_ALWAYS_OPEN_24_5_MASK = 0b0001111
+
+@dataclass(frozen=True, slots=True)
+class MarketHours:
+    """Kompakte, unveränderliche Handelszeiten eines Commodities"""
+    enabled: bool
+    kind: int
+    days_mask: int    # 7-Bit-Feld der Handelstage (Bit 0 = Montag)
+    open_min: int     # Minuten seit Mitternacht UTC
+    close_min: int
+    week_bitmap: bytes  # 1 Bit pro Wochenminute (weekday * 1440 + minute_of_day), 1 = offen
+    # Wie week_bitmap, aber für Zeitpunkte nach HH:MM:00 - ohne die Schluss-Minuten
+    # (close_time ist inklusive nur exakt zur vollen Minute, 21:00:01 ist geschlossen)
+    week_bitmap_intra: bytes
+
+MINUTES_PER_DAY = 1440
+_WEEK_BITMAP_BYTES = 7 * MINUTES_PER_DAY // 8
+
+
+@lru_cache(maxsize=256)
+def _parse_minutes(time_str: str) -> int:
+    """Parst einen "HH:MM" String einmalig zu Minuten seit Mitternacht (gecacht)"""
+    hour, minute = map(int, time_str.split(":"))
+    return hour * 60 + minute
+
+
+def _days_to_mask(days: Iterable[int]) -> int:
+    """Wandelt eine Liste von Wochentagen (0=Montag) in eine Bitmaske um"""
+    mask = 0
+    for day in days:
+        mask |= 1 << day
+    return mask
+
+
+def _minute_range_bits(start: int, end: int) -> int:
+    """Setzt die Bits start..end (inklusive) der Wochen-Bitmap"""
+    if end < start:
+        return 0
+    return ((1 << (end - start + 1)) - 1) << start
+
+
+def _build_week_bitmap(enabled: bool, kind: int, days_mask: int, open_min: int, close_min: int,
+                       include_close_minute: bool = True) -> bytes:
+    """
+    Berechnet für einen Zeitplan einmalig den offen/geschlossen-Status jeder Wochenminute
+    
+    include_close_minute=False liefert den Status innerhalb der Minute (nach HH:MM:00):
+    Handelsfenster, die um close_time enden, enden dann eine Minute früher.
+    """
+    if not enabled:
+        return bytes(_WEEK_BITMAP_BYTES)
+    
+    bits = 0
+    last_minute = MINUTES_PER_DAY - 1
+    open_min = min(open_min, MINUTES_PER_DAY)
+    close_min = min(close_min, last_minute)
+    if not include_close_minute:
+        close_min -= 1
+    
+    if kind == KIND_24_7:
+        bits = _minute_range_bits(0, 7 * MINUTES_PER_DAY - 1)
+    elif kind == KIND_24_5:
+        # Montag (0) bis Donnerstag (3): Immer offen
+        for day in range(7):
+            if _ALWAYS_OPEN_24_5_MASK & (1 << day):
+                bits |= _minute_range_bits(day * MINUTES_PER_DAY, day * MINUTES_PER_DAY + last_minute)
+        # Freitag (4): Offen bis close_time, Sonntag (6): Offen ab open_time, Samstag (5): Geschlossen
+        bits |= _minute_range_bits(4 * MINUTES_PER_DAY, 4 * MINUTES_PER_DAY + close_min)
+        bits |= _minute_range_bits(6 * MINUTES_PER_DAY + open_min, 6 * MINUTES_PER_DAY + last_minute)
+    else:
+        # Normale Börsenzeiten: an jedem Handelstag von open_time bis close_time
+        for day in range(7):
+            if days_mask & (1 << day):
+                bits |= _minute_range_bits(day * MINUTES_PER_DAY + open_min, day * MINUTES_PER_DAY + close_min)
+    
+    return bits.to_bytes(_WEEK_BITMAP_BYTES, "little")
+
+
+def _make_market_hours(enabled: bool, kind: int, days_mask: int, open_min: int, close_min: int) -> MarketHours:
+    """Erstellt einen MarketHours-Eintrag inklusive vorberechneter Wochen-Bitmap"""
+    return MarketHours(
+        enabled=enabled,
+        kind=kind,
+        days_mask=days_mask,
+        open_min=open_min,
+        close_min=close_min,
+        week_bitmap=_build_week_bitmap(enabled, kind, days_mask, open_min, close_min),
+        week_bitmap_intra=_build_week_bitmap(enabled, kind, days_mask, open_min, close_min,
+                                             include_close_minute=False)
+    )
+
+
+@lru_cache(maxsize=256)
+def _resolve_market_hours(enabled: bool, is_24_7: bool, is_24_5: bool, days: Tuple[int, ...],
+                          open_min: Optional[int], close_min: Optional[int]) -> MarketHours:
+    """Erstellt MarketHours aus den Config-Werten (gecacht - gleiche Werte, gleiche Instanz)"""
+    if is_24_7:
+        kind = KIND_24_7
+    elif is_24_5:
+        kind = KIND_24_5
+    else:
+        kind = KIND_NORMAL
+    
+    # 24/5 Märkte öffnen standardmäßig Sonntag 22:00 und schließen Freitag 21:00
+    default_open, default_close = (22 * 60, 21 * 60) if kind == KIND_24_5 else (0, 23 * 60 + 59)
+    
+    return _make_market_hours(
+        enabled=enabled,
+        kind=kind,
+        days_mask=_days_to_mask(days),
+        open_min=default_open if open_min is None else open_min,
+        close_min=default_close if close_min is None else close_min
+    )
+
+
+def _config_minutes(hours: Dict, time_key: str, minutes_key: str) -> Optional[int]:
+    """Minutenwert einer Config - vorgeparst (siehe update_market_hours) oder aus "HH:MM" """
+    minutes = hours.get(minutes_key)
+    if minutes is None and hours.get(time_key):
+        minutes = _parse_minutes(hours[time_key])
+    return minutes
+
+
+def _to_market_hours(hours: Dict) -> MarketHours:
+    """Wandelt eine Handelszeiten-Config (Dict aus Defaults/DB) in MarketHours um"""
+    return _resolve_market_hours(
+        bool(hours.get("enabled", True)),
+        bool(hours.get("is_24_7", False)),
+        bool(hours.get("is_24_5", False)),
+        tuple(hours.get("days", (0, 1, 2, 3, 4))),
+        _config_minutes(hours, "open_time", "open_min"),
+        _config_minutes(hours, "close_time", "close_min")
+    )
+
+
+def _normalize_hours_config(hours_config: Dict) -> Dict:
+    """Validiert eine Config und speichert die Zeiten zusätzlich als Minuten seit Mitternacht"""
+    normalized = dict(hours_config)
+    for time_key, minutes_key in (("open_time", "open_min"), ("close_time", "close_min")):
+        if normalized.get(time_key):
+            # Wirft ValueError bei ungültigem Format - vor dem Speichern statt bei jedem Lesen
+            normalized[minutes_key] = _parse_minutes(normalized[time_key])
+        else:
+            normalized.pop(minutes_key, None)
+    return normalized
+
+
+def _build_hours_table(hours_config: Dict) -> Dict[str, MarketHours]:
+    """Baut die MarketHours-Tabelle; identische Zeitpläne teilen sich eine Instanz"""
+    return {commodity_id: _to_market_hours(hours) for commodity_id, hours in hours_config.items()}
+
+
+_HOURS = _build_hours_table(DEFAULT_MARKET_HOURS)
+
+# Unbekanntes Commodity - Standard 24/5 (ganztägig)
+_UNKNOWN_MARKET_HOURS = _make_market_hours(
+    enabled=True,
+    kind=KIND_24_5,
+    days_mask=_days_to_mask([0, 1, 2, 3, 4]),
+    open_min=0,
+    close_min=23 * 60 + 59
+)
+
+# Commodities ohne Handelszeiten, für die bereits gewarnt wurde
+_warned_unknown = set()
+
+# Cache für get_market_hours (DB-Ergebnis), Gültigkeit in Sekunden
+_HOURS_CACHE_TTL = 60.0
+_hours_cache: Optional[Mapping[str, Dict]] = None
+_hours_saved: Optional[Dict] = None  # In der DB gespeicherte Hours hinter _hours_cache
+_hours_cache_time = 0.0
+_hours_cache_generation = 0
+# Laufende DB-Abfrage, auf die gleichzeitige get_market_hours-Aufrufe warten
+_hours_inflight: Optional[asyncio.Task] = None
+
+
+def _is_open(hours: MarketHours, weekday: int, minute_of_day: int, on_the_minute: bool = True) -> bool:
+    """
+    Wertet einen Zeitplan aus (weekday: 0=Montag, minute_of_day: Minuten seit Mitternacht UTC)
+    
+    on_the_minute: Zeitpunkt liegt exakt auf HH:MM:00 (siehe _minute_position)
+    """
+    index = weekday * MINUTES_PER_DAY + minute_of_day
+    bitmap = hours.week_bitmap if on_the_minute else hours.week_bitmap_intra
+    return bool(bitmap[index >> 3] & (1 << (index & 7)))
+
+
+def _minute_position(current_time: datetime) -> Tuple[int, int, bool]:
+    """(weekday, minute_of_day, on_the_minute) eines Zeitpunkts"""
+    on_the_minute = current_time.second == 0 and current_time.microsecond == 0
+    return current_time.weekday(), current_time.hour * 60 + current_time.minute, on_the_minute
+
+
+def _resolve_hours(commodity_id: str, market_hours: Optional[Mapping[str, Dict]]) -> MarketHours:
+    """Hole Handelszeiten (Custom oder Default) für ein Commodity"""
+    if market_hours is not None and commodity_id in market_hours:
+        hours_config = market_hours[commodity_id]
+        # Default-Config (z.B. über get_market_hours) - bereits aufgelöst
+        if hours_config is DEFAULT_MARKET_HOURS.get(commodity_id):
+            return _HOURS[commodity_id]
+        return _to_market_hours(hours_config)
+    
+    hours = _HOURS.get(commodity_id)
+    if hours is None:
+        # Nur einmal pro unbekanntem Commodity warnen (wird im Bot-Loop ständig geprüft)
+        if commodity_id not in _warned_unknown:
+            _warned_unknown.add(commodity_id)
+            logger.warning(f"Keine Handelszeiten für {commodity_id} definiert - verwende Standard 24/5")
+        return _UNKNOWN_MARKET_HOURS
+    return hours
+
+
+def invalidate_market_hours_cache():
+    """Verwirft gecachte Handelszeiten (z.B. nach Änderung der Handelszeiten)"""
+    global _hours_cache, _hours_saved
+    _hours_cache = None
+    _hours_saved = None
+    _discard_pending_hours_loads()
+
+
+def _discard_pending_hours_loads():
+    """Laufende DB-Abfragen dürfen ihr (evtl. veraltetes) Ergebnis nicht mehr cachen"""
+    global _hours_cache_generation, _hours_inflight
+    _hours_cache_generation += 1
+    _hours_inflight = None
+
+
+def _set_hours_cache(saved_hours: Dict, loaded_at: float):
+    """Ersetzt den Cache atomar durch einen neuen, unveränderlichen Stand"""
+    global _hours_cache, _hours_saved, _hours_cache_time
+    _hours_saved = saved_hours
+    _hours_cache = _overlay_defaults(saved_hours)
+    _hours_cache_time = loaded_at
+
+
+def is_market_open(commodity_id: str, market_hours: Optional[Mapping[str, Dict]] = None, current_time: Optional[datetime] = None) -> bool:
     """
     Prüft ob ein spezifisches Commodity aktuell handelbar ist
     
@@ -192,107 +444,103 @@ def is_market_open(commodity_id: str, market_hours: Optional[Dict] = None, curre
     if current_time is None:
         current_time = datetime.now(timezone.utc)
     
-    # Hole Handelszeiten (Custom oder Default)
-    if market_hours and commodity_id in market_hours:
-        hours = market_hours[commodity_id]
-    elif commodity_id in DEFAULT_MARKET_HOURS:
-        hours = DEFAULT_MARKET_HOURS[commodity_id]
-    else:
-        # Unbekanntes Commodity - Standard 24/5
-        logger.warning(f"Keine Handelszeiten für {commodity_id} definiert - verwende Standard 24/5")
-        hours = {
-            "enabled": True,
-            "days": [0, 1, 2, 3, 4],
-            "open_time": "00:00",
-            "close_time": "23:59",
-            "is_24_5": True
-        }
-    
-    # Check ob Handelszeiten deaktiviert sind
-    if not hours.get("enabled", True):
-        return False
-    
-    # Check Wochentag (0=Montag, 6=Sonntag)
-    current_weekday = current_time.weekday()
-    
-    # Für 24/7 Märkte (Crypto)
-    if hours.get("is_24_7", False):
-        return True
-    
-    # Für 24/5 Märkte (Forex, Edelmetalle, Energie)
-    if hours.get("is_24_5", False):
-        # Öffnet Sonntag Abend (6), schließt Freitag Abend (4)
-        # Montag (0) bis Donnerstag (3): Immer offen
-        if current_weekday in [0, 1, 2, 3]:
-            return True
-        
-        # Sonntag (6): Offen ab open_time
-        if current_weekday == 6:
-            open_time_str = hours.get("open_time", "22:00")
-            open_hour, open_min = map(int, open_time_str.split(":"))
-            open_time_obj = time(open_hour, open_min)
-            current_time_obj = current_time.time()
-            return current_time_obj >= open_time_obj
-        
-        # Freitag (4): Offen bis close_time
-        if current_weekday == 4:
-            close_time_str = hours.get("close_time", "21:00")
-            close_hour, close_min = map(int, close_time_str.split(":"))
-            close_time_obj = time(close_hour, close_min)
-            current_time_obj = current_time.time()
-            return current_time_obj <= close_time_obj
-        
-        # Samstag (5): Geschlossen
-        return False
-    
-    # Für normale Börsenzeiten (Agrar, Aktien)
-    if current_weekday not in hours.get("days", [0, 1, 2, 3, 4]):
-        return False
+    hours = _resolve_hours(commodity_id, market_hours)
+    return _is_open(hours, *_minute_position(current_time))
+
+
+def are_markets_open(commodity_ids: List[str], market_hours: Optional[Mapping[str, Dict]] = None, current_time: Optional[datetime] = None) -> Dict[str, bool]:
+    """
+    Prüft mehrere Commodities für denselben Zeitpunkt
     
-    # Prüfe Tageszeit
-    open_time_str = hours.get("open_time", "00:00")
-    close_time_str = hours.get("close_time", "23:59")
+    Uhrzeit und Wochentag werden nur einmal ermittelt statt pro Commodity.
     
-    open_hour, open_min = map(int, open_time_str.split(":"))
-    close_hour, close_min = map(int, close_time_str.split(":"))
+    Returns:
+        Dict {commodity_id: True wenn Markt offen}
+    """
+    if current_time is None:
+        current_time = datetime.now(timezone.utc)
     
-    open_time_obj = time(open_hour, open_min)
-    close_time_obj = time(close_hour, close_min)
-    current_time_obj = current_time.time()
+    position = _minute_position(current_time)
     
-    return open_time_obj <= current_time_obj <= close_time_obj
+    return {
+        commodity_id: _is_open(_resolve_hours(commodity_id, market_hours), *position)
+        for commodity_id in commodity_ids
+    }
 
 
-async def get_market_hours(db) -> Dict:
-    """Hole alle Handelszeiten aus der DB (oder verwende Defaults)"""
+def _overlay_defaults(saved_hours: Dict) -> Mapping[str, Dict]:
+    """Legt gespeicherte Handelszeiten read-only über die Defaults (ohne Kopie)"""
+    return MappingProxyType(ChainMap(saved_hours, DEFAULT_MARKET_HOURS))
+
+
+async def _load_market_hours(db) -> Mapping[str, Dict]:
+    """Liest die Handelszeiten aus der DB und aktualisiert den Cache"""
+    generation = _hours_cache_generation
+    saved_hours = {}
     try:
         doc = await db.commodity_market_hours.find_one({"id": "market_hours"})
         
         if doc and "hours" in doc:
-            return doc["hours"]
+            saved_hours = doc["hours"]
     except Exception as e:
+        # Keine Custom Hours in DB - verwende Defaults
         logger.debug(f"Commodity market hours collection not found or empty, using defaults: {e}")
     
-    # Keine Custom Hours in DB - verwende Defaults
-    return DEFAULT_MARKET_HOURS
+    # Nicht cachen, wenn während des Lesens invalidiert wurde (Ergebnis evtl. veraltet)
+    if generation != _hours_cache_generation:
+        return _overlay_defaults(saved_hours)
+    
+    _set_hours_cache(saved_hours, monotonic())
+    return _hours_cache
 
 
-async def update_market_hours(db, commodity_id: str, hours_config: Dict):
-    """Update Handelszeiten für ein spezifisches Commodity"""
-    # Hole existierende Config oder erstelle neue
-    doc = await db.commodity_market_hours.find_one({"id": "market_hours"})
+def _clear_hours_inflight(task: asyncio.Task):
+    global _hours_inflight
+    if _hours_inflight is task:
+        _hours_inflight = None
+
+
+async def get_market_hours(db, use_cache: bool = True) -> Mapping[str, Dict]:
+    """Hole alle Handelszeiten aus der DB (oder verwende Defaults)
+    
+    Das Ergebnis wird für _HOURS_CACHE_TTL Sekunden gecacht und ist read-only.
+    Gleichzeitige Aufrufe bei leerem Cache teilen sich eine DB-Abfrage.
+    """
+    global _hours_inflight
+    
+    if not use_cache:
+        return await _load_market_hours(db)
     
-    if not doc:
-        doc = {"id": "market_hours", "hours": DEFAULT_MARKET_HOURS.copy()}
+    if _hours_cache is not None and monotonic() - _hours_cache_time < _HOURS_CACHE_TTL:
+        return _hours_cache
     
-    # Update spezifisches Commodity
-    doc["hours"][commodity_id] = hours_config
+    if _hours_inflight is None or _hours_inflight.get_loop() is not asyncio.get_running_loop():
+        _hours_inflight = asyncio.ensure_future(_load_market_hours(db))
+        _hours_inflight.add_done_callback(_clear_hours_inflight)
     
-    # Speichere zurück
-    await db.commodity_market_hours.replace_one(
+    # shield: Abbruch eines Aufrufers bricht nicht die geteilte Abfrage ab
+    return await asyncio.shield(_hours_inflight)
+
+
+async def update_market_hours(db, commodity_id: str, hours_config: Dict) -> Mapping[str, Dict]:
+    """Update Handelszeiten für ein spezifisches Commodity"""
+    hours_config = _normalize_hours_config(hours_config)
+    
+    # Atomares Teil-Update nur dieses Commodities (kein Lesen-Ändern-Schreiben).
+    # Bei upsert übernimmt das neue Dokument die "id" aus dem Filter.
+    # Nur abweichende Handelszeiten werden gespeichert, der Rest kommt aus den Defaults.
+    await db.commodity_market_hours.update_one(
         {"id": "market_hours"},
-        doc,
+        {"$set": {f"hours.{commodity_id}": hours_config}},
         upsert=True
     )
     
-    return doc["hours"]
+    if _hours_saved is None:
+        invalidate_market_hours_cache()
+        return await get_market_hours(db, use_cache=False)
+    
+    # Write-through: neuen Stand direkt in den geladenen Cache übernehmen statt neu zu lesen.
+    # Der Ladezeitpunkt bleibt, damit Änderungen anderer Prozesse (Worker) nach TTL sichtbar werden.
+    _discard_pending_hours_loads()
+    _set_hours_cache({**_hours_saved, commodity_id: hours_config}, _hours_cache_time)
+    return _hours_cache
@@ -4,12 +4,20 @@ Commodity Data Processor for Multi-Commodity Trading
 
 import logging
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from ta.trend import SMAIndicator, EMAIndicator, MACD
 from ta.momentum import RSIIndicator
+import indicator_kernels
+from indicator_kernels import NUMBA_AVAILABLE, SCIPY_AVAILABLE
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import asyncio
+import threading
 import time
 
 logger = logging.getLogger(__name__)
@@ -17,14 +25,72 @@ logger = logging.getLogger(__name__)
 # Global reference to platform connector (will be set by server.py)
 _platform_connector = None
 
+# MetaAPI Plattform-Keys pro Broker (Reihenfolge = Priorität)
+_ICMARKETS_PLATFORM_KEYS = ('MT5_ICMARKETS_DEMO', 'MT5_ICMARKETS')
+_LIBERTEX_PLATFORM_KEYS = ('MT5_LIBERTEX_DEMO', 'MT5_LIBERTEX_REAL', 'MT5_LIBERTEX')
+
+# Index der aktiven Plattform pro Broker - der Connector hat keine Events,
+# daher kurze TTL statt Dict-Walk bei jedem Request
+_ACTIVE_PLATFORMS_TTL = 5.0
+_active_platforms = (0.0, {'icmarkets': None, 'libertex': None})  # (deadline, index)
+
 def set_platform_connector(connector):
     """Set the platform connector for fetching MetaAPI data"""
-    global _platform_connector
+    global _platform_connector, _active_platforms
     _platform_connector = connector
+    _active_platforms = (0.0, {'icmarkets': None, 'libertex': None})
+
+
+def _first_active_platform(platforms: dict, keys: tuple) -> Optional[str]:
+    for platform_key in keys:
+        platform_data = platforms.get(platform_key)
+        if platform_data and platform_data.get('active'):
+            return platform_key
+    return None
+
+
+def _get_active_platforms() -> dict:
+    """Aktive Plattform-Keys {'icmarkets': key|None, 'libertex': key|None} (max. 5s alt)"""
+    global _active_platforms
+    deadline, index = _active_platforms
+    now = time.monotonic()
+    if now < deadline:
+        return index
+    
+    platforms = _platform_connector.platforms if _platform_connector is not None else {}
+    index = {
+        'icmarkets': _first_active_platform(platforms, _ICMARKETS_PLATFORM_KEYS),
+        'libertex': _first_active_platform(platforms, _LIBERTEX_PLATFORM_KEYS),
+    }
+    _active_platforms = (now + _ACTIVE_PLATFORMS_TTL, index)
+    return index
+
+
+# Broker in Prioritätsreihenfolge: (Index-Key, Symbol-Feld in COMMODITIES, Log-Label)
+_METAAPI_BROKERS = (
+    ('icmarkets', 'mt5_icmarkets_symbol', 'ICMarkets'),
+    ('libertex', 'mt5_libertex_symbol', 'Libertex'),
+)
+
+
+# Candle-Abruf: (Plattform-Key, Symbol-Feld, Log-Label) in Prioritätsreihenfolge
+_METAAPI_CANDLE_PLATFORMS = (
+    ('MT5_ICMARKETS', 'mt5_icmarkets_symbol', 'ICMarkets'),
+    ('MT5_LIBERTEX', 'mt5_libertex_symbol', 'Libertex'),
+)
+
+
+def _metaapi_platforms(commodity: dict):
+    """Liefert (platform_key, symbol, label) für jeden aktiven Broker mit Symbol, ICMarkets zuerst"""
+    active = _get_active_platforms()
+    for broker, symbol_field, label in _METAAPI_BROKERS:
+        symbol = commodity.get(symbol_field)
+        if symbol and active[broker]:
+            yield active[broker], symbol, label
 
 
 # Handelszeiten (UTC) - Wichtig für AI Trading Bot
-MARKET_HOURS = {
+MARKET_HOURS = MappingProxyType({
     # Edelmetalle - 24/5 (Sonntag 22:00 - Freitag 21:00 UTC)
     "GOLD": {"opens": "22:00", "closes": "21:00", "days": [0,1,2,3,4], "24_5": True, "display": "24/5 (So 22:00 - Fr 21:00 UTC)"},
     "SILVER": {"opens": "22:00", "closes": "21:00", "days": [0,1,2,3,4], "24_5": True, "display": "24/5 (So 22:00 - Fr 21:00 UTC)"},
@@ -52,7 +118,62 @@ MARKET_HOURS = {
     
     # Crypto - 24/7
     "BITCOIN": {"opens": "00:00", "closes": "23:59", "days": [0,1,2,3,4,5,6], "24_7": True, "display": "24/7 (Immer geöffnet)"}
-}
+})
+
+MINUTES_PER_DAY = 1440
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def _hhmm_to_minutes(value: str) -> int:
+    hour, minute = value.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def _build_market_windows(hours: dict) -> tuple:
+    """
+    Übersetzt einen MARKET_HOURS Eintrag in Minute-der-Woche Intervalle (lo, hi), inklusive.
+    Minute der Woche = weekday * 1440 + Minute des Tages (0 = Montag 00:00 UTC)
+    """
+    if hours.get("24_7"):
+        return ((0, MINUTES_PER_WEEK - 1),)
+    
+    opens = _hhmm_to_minutes(hours["opens"])
+    closes = _hhmm_to_minutes(hours["closes"])
+    windows = []
+    for day in sorted(hours["days"]):
+        day_start = day * MINUTES_PER_DAY
+        day_end = day_start + MINUTES_PER_DAY - 1
+        if hours.get("24_5"):
+            # Sonntag ab opens, Freitag bis closes, Mo-Do ganztägig
+            if day == 6:
+                lo, hi = day_start + opens, day_end
+            elif day == 4:
+                lo, hi = day_start, day_start + closes
+            else:
+                lo, hi = day_start, day_end
+        else:
+            lo, hi = day_start + opens, day_start + closes
+        if lo > hi:
+            continue
+        # Direkt anschließende Intervalle zusammenfassen (z.B. Mo-Fr bei 24/5)
+        if windows and windows[-1][1] + 1 >= lo:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], hi))
+        else:
+            windows.append((lo, hi))
+    return tuple(windows)
+
+
+# Vorberechnete Handelsfenster je Commodity (einmalig beim Import)
+_MARKET_WINDOWS = {commodity_id: _build_market_windows(hours) for commodity_id, hours in MARKET_HOURS.items()}
+
+
+def _minute_of_week(timestamp: Optional[float] = None) -> int:
+    """Aktuelle Minute der Woche (UTC) direkt aus dem Unix-Timestamp - ohne datetime/strftime"""
+    seconds = int(time.time() if timestamp is None else timestamp)
+    # 01.01.1970 war ein Donnerstag (weekday 3)
+    weekday = (seconds // 86400 + 3) % 7
+    return weekday * MINUTES_PER_DAY + (seconds % 86400) // 60
+
 
 def is_market_open(commodity_id: str) -> bool:
     """
@@ -61,40 +182,16 @@ def is_market_open(commodity_id: str) -> bool:
     Returns:
         True wenn Markt offen, False wenn geschlossen
     """
-    try:
-        if commodity_id not in MARKET_HOURS:
-            logger.warning(f"Keine Handelszeiten für {commodity_id} definiert - assume open")
-            return True
-        
-        hours = MARKET_HOURS[commodity_id]
-        now_utc = datetime.now(timezone.utc)
-        current_weekday = now_utc.weekday()  # 0=Montag, 6=Sonntag
-        current_time = now_utc.strftime("%H:%M")
-        
-        # Crypto 24/7
-        if hours.get("24_7"):
+    windows = _MARKET_WINDOWS.get(commodity_id)
+    if windows is None:
+        logger.warning(f"Keine Handelszeiten für {commodity_id} definiert - assume open")
+        return True
+    
+    minute_of_week = _minute_of_week()
+    for lo, hi in windows:
+        if lo <= minute_of_week <= hi:
             return True
-        
-        # Prüfe Wochentag
-        if current_weekday not in hours["days"]:
-            return False
-        
-        # 24/5 Märkte (z.B. Gold, Öl)
-        if hours.get("24_5"):
-            # Sonntag ab 22:00 UTC bis Freitag 21:00 UTC
-            if current_weekday == 6:  # Sonntag
-                return current_time >= hours["opens"]
-            elif current_weekday == 4:  # Freitag
-                return current_time <= hours["closes"]
-            else:  # Mo-Do
-                return True
-        
-        # Normale Börsenzeiten
-        return hours["opens"] <= current_time <= hours["closes"]
-        
-    except Exception as e:
-        logger.error(f"Fehler bei Marktzeiten-Prüfung für {commodity_id}: {e}")
-        return True  # Im Zweifel als offen annehmen
+    return False
 
 def get_next_market_open(commodity_id: str) -> str:
     """
@@ -133,7 +230,7 @@ def get_next_market_open(commodity_id: str) -> str:
 # MT5 Libertex: Erweiterte Auswahl
 # MT5 ICMarkets: Nur Edelmetalle + WTI_F6, BRENT_F6
 # Bitpanda: Alle Rohstoffe verfügbar
-COMMODITIES = {
+COMMODITIES = MappingProxyType({
     # Precious Metals (Spot prices)
     # Libertex: ✅ XAUUSD, XAGUSD, PL, PA | ICMarkets: ✅ | Bitpanda: ✅
     "GOLD": {
@@ -308,42 +405,179 @@ COMMODITIES = {
         "unit": "USD", 
         "platforms": ["MT5_LIBERTEX", "MT5_ICMARKETS", "BITPANDA"]
     }
+})
+
+
+
+# Statischer Teil von get_commodities_with_hours (Commodity-Daten + Handelszeiten-Anzeige)
+_COMMODITIES_STATIC = {
+    commodity_id: {
+        **commodity_data,
+        'market_hours': MARKET_HOURS[commodity_id].get('display', 'Nicht verfügbar') if commodity_id in MARKET_HOURS else 'Nicht verfügbar'
+    }
+    for commodity_id, commodity_data in COMMODITIES.items()
 }
 
+# Ergebnis von get_commodities_with_hours für eine Minute der Woche: (minute_of_week, result)
+_commodities_with_hours_cache = None
 
 
 def get_commodities_with_hours():
     """
     Gibt COMMODITIES mit Handelszeiten zurück
+    
+    Der Marktstatus ändert sich höchstens einmal pro Minute - das Ergebnis wird
+    daher pro Minute gecacht und nur der market_open Status neu berechnet.
     """
-    commodities_with_hours = {}
-    for commodity_id, commodity_data in COMMODITIES.items():
-        commodity_with_hours = commodity_data.copy()
-        
-        # Füge Handelszeiten hinzu
-        if commodity_id in MARKET_HOURS:
-            market_hours = MARKET_HOURS[commodity_id]
-            commodity_with_hours['market_hours'] = market_hours.get('display', 'Nicht verfügbar')
-            commodity_with_hours['market_open'] = is_market_open(commodity_id)
-        else:
-            commodity_with_hours['market_hours'] = 'Nicht verfügbar'
-            commodity_with_hours['market_open'] = True
-        
-        commodities_with_hours[commodity_id] = commodity_with_hours
+    global _commodities_with_hours_cache
+    
+    minute_of_week = _minute_of_week()
+    if _commodities_with_hours_cache is not None and _commodities_with_hours_cache[0] == minute_of_week:
+        return _commodities_with_hours_cache[1]
     
+    commodities_with_hours = {
+        commodity_id: {
+            **static_data,
+            'market_open': is_market_open(commodity_id) if commodity_id in MARKET_HOURS else True
+        }
+        for commodity_id, static_data in _COMMODITIES_STATIC.items()
+    }
+    
+    _commodities_with_hours_cache = (minute_of_week, commodities_with_hours)
     return commodities_with_hours
 
 
+class _TTLCache:
+    """LRU-Cache mit Ablaufzeit pro Eintrag (monotonic clock, ein Dict für Daten + Ablauf)"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (deadline, value)
+        self._lock = threading.Lock()  # yfinance-Fetches schreiben aus dem Thread-Pool
+    
+    def get(self, key, allow_expired: bool = False):
+        """Hole Eintrag - None wenn nicht vorhanden oder abgelaufen (außer allow_expired)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            deadline, value = entry
+            if not allow_expired and time.monotonic() >= deadline:
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl_seconds: float):
+        """Speichere Eintrag; verdrängt bei voller Größe den am längsten ungenutzten"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            elif len(self._entries) >= self.max_size:
+                self._entries.popitem(last=False)
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+    
+    def clear(self):
+        """Alle Einträge verwerfen"""
+        with self._lock:
+            self._entries.clear()
+
+
+class _TokenBucket:
+    """Token-Bucket Rate-Limiter (thread-safe) - wartet nur, wenn das Budget erschöpft ist"""
+    
+    def __init__(self, rate: float, per: float = 1.0, burst: Optional[int] = None):
+        self.interval = per / rate
+        self.capacity = float(burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self) -> float:
+        """Reserviere ein Token und gib die nötige Wartezeit in Sekunden zurück"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * self.interval
+    
+    def acquire(self):
+        """Blockierend (für synchrone Aufrufer)"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def acquire_async(self):
+        """Nicht-blockierend für den Event-Loop"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Gemeinsames yfinance-Budget für alle Fetch-Funktionen (max. 2 Requests/Sekunde)
+_yf_bucket = _TokenBucket(rate=2, per=1.0)
+
+# Thread-Pool für blockierende yfinance-Requests aus async Code
+_yf_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="yfinance")
+
+
+# Commodities mit MetaAPI-Daten (Live-Preis bzw. historische Candles)
+_METAAPI_PRICE_SUPPORTED = frozenset({"GOLD", "SILVER", "PLATINUM", "PALLADIUM", "WTI_CRUDE", "BRENT_CRUDE", "EURUSD"})
+_METAAPI_OHLCV_SUPPORTED = frozenset({"GOLD", "SILVER", "PLATINUM", "PALLADIUM", "WTI_CRUDE", "BRENT_CRUDE"})
+
+# Map period to number of MetaAPI candles
+_PERIOD_TO_LIMIT = MappingProxyType({
+    '2h': 120,      # 2 hours with 1m candles
+    '1d': 24,       # 1 day with 1h candles
+    '5d': 120,      # 5 days
+    '1wk': 168,     # 1 week
+    '2wk': 336,     # 2 weeks
+    '1mo': 720,     # 1 month
+    '3mo': 2160,    # 3 months
+    '6mo': 4320,    # 6 months
+    '1y': 8760,     # 1 year
+    '2y': 17520,    # 2 years
+    '5y': 43800,    # 5 years
+    'max': 1000     # Max available
+})
+
+# Convert timeframe for MetaAPI
+_METAAPI_TF_MAP = MappingProxyType({'1d': '1h', '1wk': '4h', '1mo': '1d'})
+
+# yfinance timeframe mapping
+_INTERVAL_MAP = MappingProxyType({
+    '1m': '1m', '5m': '5m', '15m': '15m', '30m': '30m',
+    '1h': '1h', '2h': '2h', '4h': '4h', '1d': '1d', '1wk': '1wk', '1mo': '1mo'
+})
+
+# Period validation (includes 2h, 1wk, 2wk)
+_VALID_PERIODS = frozenset({'2h', '1d', '5d', '1wk', '2wk', '1mo', '3mo', '6mo', '1y', '2y', '5y', 'max'})
+
+# yfinance period mapping (yfinance doesn't support '2h', '1wk', '2wk')
+_YF_PERIOD_MAP = MappingProxyType({
+    '2h': '1d',     # yfinance doesn't support 2h, use 1d (then filter)
+    '1wk': '1wk',   # yfinance supports 1wk
+    '2wk': '1mo',   # yfinance doesn't support 2wk, use 1mo (then filter)
+})
+_INTRADAY_INTERVALS = frozenset({'1m', '5m', '15m', '30m'})
+_MINUTE_INTERVALS = frozenset({'1m', '5m'})
+
+
 # Simple cache for current price fetching (separate from OHLCV cache)
 # REDUCED for memory efficiency
-_price_cache = OrderedDict()
-_price_cache_expiry = OrderedDict()
 MAX_PRICE_CACHE_SIZE = 20  # Reduced from 50
+_PRICE_TTL_YFINANCE = 30 * 60     # Sekunden (monotonic) - lang, um Rate-Limits zu vermeiden
+_price_cache = _TTLCache(MAX_PRICE_CACHE_SIZE)
 
 def fetch_commodity_data(commodity_id: str):
     """
     Fetch commodity data with caching and MetaAPI priority
     Priority: MetaAPI (live broker data) → Cached yfinance → Fresh yfinance
+    
+    Returns:
+        DataFrame mit yfinance-Daten oder None (Fehler, bzw. Preis kommt über den MetaAPI-Stream)
     """
     try:
         if commodity_id not in COMMODITIES:
@@ -352,80 +586,38 @@ def fetch_commodity_data(commodity_id: str):
         
         # Check cache first (5 minutes for current price)
         cache_key = f"price_{commodity_id}"
-        now = datetime.now()
-        
-        if cache_key in _price_cache and cache_key in _price_cache_expiry:
-            if now < _price_cache_expiry[cache_key]:
-                logger.debug(f"Returning cached price data for {commodity_id}")
-                return _price_cache[cache_key]
+        cached = _price_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Returning cached price data for {commodity_id}")
+            return cached
+        
+        # Markt geschlossen: Preise ändern sich nicht - auch abgelaufenen Cache nutzen
+        if not is_market_open(commodity_id):
+            cached = _price_cache.get(cache_key, allow_expired=True)
+            if cached is not None:
+                logger.debug(f"Market closed, returning cached price data for {commodity_id}")
+                return cached
         
         commodity = COMMODITIES[commodity_id]
         
         # Priority 1: Try to get live data from MetaAPI (if available)
         if _platform_connector is not None:
-            metaapi_supported = ["GOLD", "SILVER", "PLATINUM", "PALLADIUM", "WTI_CRUDE", "BRENT_CRUDE", "EURUSD"]
-            
-            if commodity_id in metaapi_supported:
+            if commodity_id in _METAAPI_PRICE_SUPPORTED:
                 try:
-                    # Try ICMarkets first
-                    symbol = commodity.get('mt5_icmarkets_symbol')
-                    if symbol:
-                        for platform_key in ['MT5_ICMARKETS_DEMO', 'MT5_ICMARKETS']:
-                            if platform_key in _platform_connector.platforms:
-                                platform_data = _platform_connector.platforms[platform_key]
-                                if platform_data.get('active'):
-                                    # MetaAPI data is already being streamed, just return minimal hist
-                                    # Create a simple DataFrame with recent price
-                                    hist = pd.DataFrame({
-                                        'Close': [0],  # Placeholder, will be updated by live stream
-                                        'Open': [0],
-                                        'High': [0],
-                                        'Low': [0],
-                                        'Volume': [0]
-                                    })
-                                    logger.info(f"✅ Using MetaAPI streaming data for {commodity_id}")
-                                    
-                                    # Cache for 5 minutes
-                                    if len(_price_cache) >= MAX_PRICE_CACHE_SIZE:
-                                        _price_cache.popitem(last=False)
-                                        _price_cache_expiry.popitem(last=False)
-                                    
-                                    _price_cache[cache_key] = hist
-                                    _price_cache_expiry[cache_key] = now + timedelta(minutes=5)
-                                    return hist
-                    
-                    # Try Libertex as fallback
-                    symbol = commodity.get('mt5_libertex_symbol')
-                    if symbol:
-                        for platform_key in ['MT5_LIBERTEX_DEMO', 'MT5_LIBERTEX_REAL', 'MT5_LIBERTEX']:
-                            if platform_key in _platform_connector.platforms:
-                                platform_data = _platform_connector.platforms[platform_key]
-                                if platform_data.get('active'):
-                                    hist = pd.DataFrame({
-                                        'Close': [0],
-                                        'Open': [0],
-                                        'High': [0],
-                                        'Low': [0],
-                                        'Volume': [0]
-                                    })
-                                    logger.info(f"✅ Using MetaAPI streaming data (Libertex) for {commodity_id}")
-                                    
-                                    # Cache for 5 minutes
-                                    if len(_price_cache) >= MAX_PRICE_CACHE_SIZE:
-                                        _price_cache.popitem(last=False)
-                                        _price_cache_expiry.popitem(last=False)
-                                    
-                                    _price_cache[cache_key] = hist
-                                    _price_cache_expiry[cache_key] = now + timedelta(minutes=5)
-                                    return hist
+                    # MetaAPI data is already being streamed - kein Platzhalter-DataFrame
+                    # mit Nullpreisen, den Indikator-Code sonst verarbeiten würde
+                    streaming = next(_metaapi_platforms(commodity), None)
+                    if streaming is not None:
+                        logger.info(f"✅ Using MetaAPI streaming data ({streaming[2]}) for {commodity_id}")
+                        return None
                 except Exception as e:
                     logger.warning(f"MetaAPI check failed for {commodity_id}: {e}, falling back to yfinance")
         
         # Priority 2: yfinance with longer cache (30 minutes to avoid rate limits)
         ticker = yf.Ticker(commodity["symbol"])
         
-        # Add delay to avoid rate limiting (only if not cached)
-        time.sleep(0.5)
+        # Rate limiting (only if not cached) - wartet nur bei erschöpftem Budget
+        _yf_bucket.acquire()
         
         # Get historical data (reduced period to avoid rate limits)
         hist = ticker.history(period="5d", interval="1h")
@@ -433,40 +625,97 @@ def fetch_commodity_data(commodity_id: str):
         if hist.empty or len(hist) == 0:
             logger.warning(f"No data received for {commodity['name']}")
             # Return stale cache if available
-            if cache_key in _price_cache:
+            stale = _price_cache.get(cache_key, allow_expired=True)
+            if stale is not None:
                 logger.warning(f"Returning stale cached data for {commodity_id}")
-                return _price_cache[cache_key]
-            return None
+            return stale
         
         # Cache for 30 minutes (longer to avoid rate limits)
-        if len(_price_cache) >= MAX_PRICE_CACHE_SIZE:
-            _price_cache.popitem(last=False)
-            _price_cache_expiry.popitem(last=False)
-        
-        _price_cache[cache_key] = hist
-        _price_cache_expiry[cache_key] = now + timedelta(minutes=30)
+        _price_cache.set(cache_key, hist, _PRICE_TTL_YFINANCE)
         
         return hist
     except Exception as e:
         logger.error(f"Error fetching {commodity_id} data: {e}")
         # Try to return cached data even if expired
-        cache_key = f"price_{commodity_id}"
-        if cache_key in _price_cache:
+        stale = _price_cache.get(f"price_{commodity_id}", allow_expired=True)
+        if stale is not None:
             logger.warning(f"Error occurred, returning stale cached data for {commodity_id}")
-            return _price_cache[cache_key]
-        return None
-
+        return stale
 
-import time
-from datetime import timedelta
 
 # Cache for OHLCV data to avoid rate limiting
 # MEMORY FIX: LRU Cache mit maximaler Größe
-from collections import OrderedDict
-
 MAX_CACHE_SIZE = 30  # Reduced from 100 for memory efficiency
-_ohlcv_cache = OrderedDict()
-_cache_expiry = OrderedDict()
+_OHLCV_TTL_METAAPI = 60 * 60          # Sekunden (monotonic)
+_OHLCV_TTL_YFINANCE = 24 * 60 * 60    # 24h für yfinance wegen Rate-Limits
+_ohlcv_cache = _TTLCache(MAX_CACHE_SIZE)
+
+
+_PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+_INT32_MAX = np.iinfo(np.int32).max
+# float32 hat ~7 signifikante Stellen - darüber wären die Cent-Beträge schon Rundungsrauschen
+_FLOAT32_MAX_PRICE = 1e3
+# Kategorien, die immer float64 behalten (Forex: fünfte Nachkommastelle, Crypto: Preisbereich)
+_FLOAT64_CATEGORIES = frozenset(('Forex', 'Crypto'))
+
+
+def _compact_ohlcv(df: Optional[pd.DataFrame], commodity_id: str) -> Optional[pd.DataFrame]:
+    """
+    Kompakte Form für den OHLCV-Cache
+    
+    Nach calculate_indicators liegt jede Indikator-Spalte in einem eigenen
+    pandas-Block; die Kopie fasst alle Float-Spalten zu einem zusammenhängenden
+    2D-Array zusammen (einmal pro Cache-Miss statt bei jedem späteren Zugriff).
+    
+    Preise werden auf float32 reduziert, solange die Spalte unter _FLOAT32_MAX_PRICE
+    bleibt (sonst würde float32 die zweite Nachkommastelle verrauschen), Volume auf
+    int32 (wenn ohne Lücken und im Wertebereich). Forex und Crypto bleiben float64.
+    """
+    if df is None:
+        return None
+    df = df.copy()
+    if COMMODITIES[commodity_id].get('category') in _FLOAT64_CATEGORIES:
+        return df
+    
+    for col in _PRICE_COLUMNS:
+        if col in df.columns and df[col].abs().max() <= _FLOAT32_MAX_PRICE:
+            df[col] = df[col].astype(np.float32, copy=False)
+    if 'Volume' in df.columns:
+        volume = df['Volume']
+        if not volume.isna().any() and (volume.empty or volume.max() <= _INT32_MAX):
+            df['Volume'] = volume.astype(np.int32, copy=False)
+    return df
+
+# Ein Record pro Candle - Feldnamen entsprechen direkt den yfinance-Spalten
+_CANDLE_DTYPE = np.dtype([
+    ('time', object),
+    ('Open', np.float64),
+    ('High', np.float64),
+    ('Low', np.float64),
+    ('Close', np.float64),
+    ('Volume', np.float64),
+])
+
+
+def _candles_to_df(candles: list) -> pd.DataFrame:
+    """
+    Wandle MetaAPI-Candles (Liste von Dicts) in einem Durchlauf in ein DataFrame im yfinance-Format um
+    
+    Index: 'Date' (aus 'time'), Spalten: Open, High, Low, Close, Volume
+    """
+    records = np.fromiter(
+        (
+            # MetaAPI liefert je nach Broker nur tickVolume
+            (c['time'], c['open'], c['high'], c['low'], c['close'], c.get('volume', c.get('tickVolume', 0)))
+            for c in candles
+        ),
+        dtype=_CANDLE_DTYPE,
+        count=len(candles),
+    )
+    df = pd.DataFrame(records)
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop('time')), name='Date')
+    return df
+
 
 async def fetch_metaapi_candles(commodity_id: str, timeframe: str = "1h", limit: int = 100) -> Optional[pd.DataFrame]:
     """
@@ -490,50 +739,19 @@ async def fetch_metaapi_candles(commodity_id: str, timeframe: str = "1h", limit:
         if _platform_connector is None:
             return None
         
-        # Try ICMarkets first (primary broker)
-        symbol = commodity.get('mt5_icmarkets_symbol')
-        if symbol and 'MT5_ICMARKETS' in _platform_connector.platforms:
-            connector = _platform_connector.platforms['MT5_ICMARKETS'].get('connector')
+        # ICMarkets first (primary broker), Libertex as fallback - feste Legacy-Keys,
+        # ohne 'active'-Prüfung (anders als _metaapi_platforms für die Live-Preise)
+        platforms = _platform_connector.platforms
+        for platform_key, symbol_field, label in _METAAPI_CANDLE_PLATFORMS:
+            symbol = commodity.get(symbol_field)
+            if not symbol or platform_key not in platforms:
+                continue
+            connector = platforms[platform_key].get('connector')
             if connector:
                 candles = await connector.get_candles(symbol, timeframe, limit)
                 if candles and len(candles) > 0:
-                    # Convert to DataFrame
-                    df = pd.DataFrame(candles)
-                    # Rename columns to match yfinance format
-                    if 'time' in df.columns:
-                        df['Date'] = pd.to_datetime(df['time'])
-                        df.set_index('Date', inplace=True)
-                    if 'open' in df.columns:
-                        df.rename(columns={
-                            'open': 'Open',
-                            'high': 'High',
-                            'low': 'Low',
-                            'close': 'Close',
-                            'volume': 'Volume'
-                        }, inplace=True)
-                    logger.info(f"✅ Fetched {len(df)} candles from MetaAPI for {commodity_id}")
-                    return df
-        
-        # Fallback to Libertex if ICMarkets unavailable
-        symbol = commodity.get('mt5_libertex_symbol')
-        if symbol and 'MT5_LIBERTEX' in _platform_connector.platforms:
-            connector = _platform_connector.platforms['MT5_LIBERTEX'].get('connector')
-            if connector:
-                candles = await connector.get_candles(symbol, timeframe, limit)
-                if candles and len(candles) > 0:
-                    df = pd.DataFrame(candles)
-                    if 'time' in df.columns:
-                        df['Date'] = pd.to_datetime(df['time'])
-                        df.set_index('Date', inplace=True)
-                    if 'open' in df.columns:
-                        df.rename(columns={
-                            'open': 'Open',
-                            'high': 'High',
-                            'low': 'Low',
-                            'close': 'Close',
-                            'volume': 'Volume'
-                        }, inplace=True)
-                    logger.info(f"✅ Fetched {len(df)} candles from MetaAPI Libertex for {commodity_id}")
+                    df = _candles_to_df(candles)
+                    logger.info(f"✅ Fetched {len(df)} candles from MetaAPI {label} for {commodity_id}")
                     return df
         
         return None
@@ -542,6 +760,100 @@ async def fetch_metaapi_candles(commodity_id: str, timeframe: str = "1h", limit:
         return None
 
 
+@dataclass(frozen=True, slots=True)
+class _RequestPlan:
+    """Aufgelöste Abrufparameter für eine (timeframe, period) Kombination"""
+    period: str                       # validierter Zeitraum
+    interval: str                     # yfinance interval
+    yf_period: str                    # yfinance period (ggf. größer als period)
+    metaapi_tf: str                   # MetaAPI Timeframe
+    limit: int                        # Anzahl MetaAPI-Candles
+    cutoff: Optional[timedelta]       # nachträglicher Zuschnitt, wenn yf_period > period
+
+
+def _build_request_plan(timeframe: str, period: str) -> _RequestPlan:
+    """Übersetze timeframe/period in yfinance- und MetaAPI-Parameter"""
+    # MetaAPI arbeitet mit dem angefragten (auch ungültigen) period/timeframe
+    limit = _PERIOD_TO_LIMIT.get(period, 720)
+    metaapi_tf = _METAAPI_TF_MAP.get(timeframe, timeframe)
+    
+    if period not in _VALID_PERIODS:
+        period = '1mo'
+    
+    interval = _INTERVAL_MAP.get(timeframe, '1d')
+    
+    # Special handling for very short timeframes (1m, 5m)
+    # For short intraday intervals (1m, 5m, 15m, 30m), we need to fetch enough data
+    # yfinance limits: 1m = max 7d, 5m = max 60d
+    if interval in _INTRADAY_INTERVALS and period in ('2h', '1d'):
+        yf_period = '1d'  # Ensure we get enough intraday data
+    elif interval in _MINUTE_INTERVALS and period in ('5d', '1wk'):
+        yf_period = '5d'  # For 1-5min intervals, limit to 5d for stability
+    else:
+        yf_period = _YF_PERIOD_MAP.get(period, period)
+    
+    # Filter data if we requested 2h but got 1d / 2wk but got 1mo
+    cutoff = None
+    if period == '2h' and yf_period == '1d':
+        cutoff = timedelta(hours=2)
+    elif period == '2wk' and yf_period == '1mo':
+        cutoff = timedelta(weeks=2)
+    
+    return _RequestPlan(period, interval, yf_period, metaapi_tf, limit, cutoff)
+
+
+# Entscheidungstabelle für alle gültigen Kombinationen (einmal beim Import)
+_REQUEST_PLAN = MappingProxyType({
+    (timeframe, period): _build_request_plan(timeframe, period)
+    for timeframe in _INTERVAL_MAP
+    for period in _VALID_PERIODS
+})
+
+
+def _get_request_plan(timeframe: str, period: str) -> _RequestPlan:
+    plan = _REQUEST_PLAN.get((timeframe, period))
+    if plan is None:
+        # Unbekannte Kombination - gleiche Fallback-Regeln wie bisher
+        plan = _build_request_plan(timeframe, period)
+    return plan
+
+
+def _trim_history(hist: pd.DataFrame, plan: _RequestPlan) -> pd.DataFrame:
+    """Schneide auf den angefragten Zeitraum zu, wenn yfinance mehr liefern musste"""
+    if plan.cutoff is None:
+        return hist
+    # Make cutoff_time timezone-aware to match hist.index
+    cutoff_time = pd.Timestamp.now(tz=hist.index.tz) - plan.cutoff
+    hist = hist[hist.index >= cutoff_time]
+    logger.info(f"Filtered to last {plan.period}: {len(hist)} candles")
+    return hist
+
+
+def _sync_yf_fetch(commodity_id: str, timeframe: str, period: str) -> Optional[pd.DataFrame]:
+    """Blockierender yfinance-Fetch inkl. Indikatoren und Cache (läuft in _yf_executor)"""
+    commodity = COMMODITIES[commodity_id]
+    plan = _get_request_plan(timeframe, period)
+    
+    # Get historical data with specified timeframe
+    logger.info(f"Fetching {commodity['name']} data: period={plan.period} (yf_period={plan.yf_period}), interval={plan.interval}")
+    
+    hist = yf.Ticker(commodity["symbol"]).history(period=plan.yf_period, interval=plan.interval)
+    
+    if hist.empty or len(hist) == 0:
+        logger.warning(f"No data received for {commodity['name']}")
+        return None
+    
+    hist = _trim_history(hist, plan)
+    
+    # Add indicators
+    hist = _compact_ohlcv(calculate_indicators(hist), commodity_id)
+    
+    # Cache successful result (24 hours for yfinance to avoid rate limiting)
+    _ohlcv_cache.set(f"{commodity_id}_{timeframe}_{period}", hist, _OHLCV_TTL_YFINANCE)
+    
+    return hist
+
+
 async def fetch_historical_ohlcv_async(commodity_id: str, timeframe: str = "1d", period: str = "1mo"):
     """
     Fetch historical OHLCV data with timeframe selection (Async version)
@@ -562,52 +874,29 @@ async def fetch_historical_ohlcv_async(commodity_id: str, timeframe: str = "1d",
         
         # Check cache first (extended to 24 hours for yfinance data)
         cache_key = f"{commodity_id}_{timeframe}_{period}"
-        now = datetime.now()
-        
-        if cache_key in _ohlcv_cache and cache_key in _cache_expiry:
-            if now < _cache_expiry[cache_key]:
-                logger.info(f"Returning cached data for {commodity_id}")
-                return _ohlcv_cache[cache_key]
+        cached = _ohlcv_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Returning cached data for {commodity_id}")
+            return cached
+        
+        # Markt geschlossen: keine neuen Kerzen - auch abgelaufenen Cache nutzen
+        if not is_market_open(commodity_id):
+            cached = _ohlcv_cache.get(cache_key, allow_expired=True)
+            if cached is not None:
+                logger.info(f"Market closed, returning cached data for {commodity_id}")
+                return cached
         
         commodity = COMMODITIES[commodity_id]
         
         # Priority 1: Try MetaAPI for supported commodities (Gold, Silver, Platinum, WTI, Brent)
-        import asyncio
-        metaapi_supported = ["GOLD", "SILVER", "PLATINUM", "PALLADIUM", "WTI_CRUDE", "BRENT_CRUDE"]
-        
-        if commodity_id in metaapi_supported:
+        if commodity_id in _METAAPI_OHLCV_SUPPORTED:
             try:
-                # Map period to number of candles
-                period_to_limit = {
-                    '2h': 120,      # 2 hours with 1m candles
-                    '1d': 24,       # 1 day with 1h candles
-                    '5d': 120,      # 5 days
-                    '1wk': 168,     # 1 week
-                    '2wk': 336,     # 2 weeks
-                    '1mo': 720,     # 1 month
-                    '3mo': 2160,    # 3 months
-                    '6mo': 4320,    # 6 months
-                    '1y': 8760,     # 1 year
-                    '2y': 17520,    # 2 years
-                    '5y': 43800,    # 5 years
-                    'max': 1000     # Max available
-                }
-                limit = period_to_limit.get(period, 720)
-                
-                # Convert timeframe for MetaAPI
-                tf_map = {'1d': '1h', '1wk': '4h', '1mo': '1d'}
-                metaapi_tf = tf_map.get(timeframe, timeframe)
-                
-                metaapi_data = await fetch_metaapi_candles(commodity_id, metaapi_tf, limit)
+                plan = _get_request_plan(timeframe, period)
+                metaapi_data = await fetch_metaapi_candles(commodity_id, plan.metaapi_tf, plan.limit)
                 if metaapi_data is not None and not metaapi_data.empty:
+                    metaapi_data = _compact_ohlcv(metaapi_data, commodity_id)
                     # Cache for 1 hour (MetaAPI data is fresh)
-                    # MEMORY FIX: Evict oldest if cache is full
-                    if len(_ohlcv_cache) >= MAX_CACHE_SIZE:
-                        _ohlcv_cache.popitem(last=False)  # Remove oldest (FIFO)
-                        _cache_expiry.popitem(last=False)
-                    
-                    _ohlcv_cache[cache_key] = metaapi_data
-                    _cache_expiry[cache_key] = now + timedelta(hours=1)
+                    _ohlcv_cache.set(cache_key, metaapi_data, _OHLCV_TTL_METAAPI)
                     return metaapi_data
                 else:
                     logger.info(f"MetaAPI unavailable for {commodity_id}, falling back to yfinance")
@@ -615,117 +904,90 @@ async def fetch_historical_ohlcv_async(commodity_id: str, timeframe: str = "1d",
                 logger.warning(f"MetaAPI fetch failed for {commodity_id}: {e}, using yfinance")
         
         # Priority 2: yfinance with extended caching (24h)
-        ticker = yf.Ticker(commodity["symbol"])
-        
-        # Timeframe mapping
-        interval_map = {
-            '1m': '1m', '5m': '5m', '15m': '15m', '30m': '30m',
-            '1h': '1h', '2h': '2h', '4h': '4h', '1d': '1d', '1wk': '1wk', '1mo': '1mo'
-        }
-        
-        # Period validation (includes 2h, 1wk, 2wk)
-        valid_periods = ['2h', '1d', '5d', '1wk', '2wk', '1mo', '3mo', '6mo', '1y', '2y', '5y', 'max']
-        if period not in valid_periods:
-            period = '1mo'
-        
-        interval = interval_map.get(timeframe, '1d')
-        
-        # yfinance period mapping (yfinance doesn't support '2h', '1wk', '2wk')
-        # For short intraday intervals (1m, 5m, 15m, 30m), we need to fetch enough data
-        yf_period_map = {
-            '2h': '1d',     # yfinance doesn't support 2h, use 1d (then filter)
-            '1wk': '1wk',   # yfinance supports 1wk
-            '2wk': '1mo',   # yfinance doesn't support 2wk, use 1mo (then filter)
-        }
-        
-        # Special handling for very short timeframes (1m, 5m)
-        # yfinance limits: 1m = max 7d, 5m = max 60d
-        if interval in ['1m', '5m', '15m', '30m'] and period in ['2h', '1d']:
-            yf_period = '1d'  # Ensure we get enough intraday data
-        elif interval in ['1m', '5m'] and period in ['5d', '1wk']:
-            yf_period = '5d'  # For 1-5min intervals, limit to 5d for stability
-        else:
-            yf_period = yf_period_map.get(period, period)
-        
-        # Get historical data with specified timeframe
-        logger.info(f"Fetching {commodity['name']} data: period={period} (yf_period={yf_period}), interval={interval}")
-        
-        # Add delay to avoid rate limiting
-        time.sleep(0.5)
-        
-        hist = ticker.history(period=yf_period, interval=interval)
-        
-        if hist.empty or len(hist) == 0:
-            logger.warning(f"No data received for {commodity['name']}")
-            return None
-        
-        # Filter data if we requested 2h but got 1d (for intraday intervals)
-        if period == '2h' and yf_period == '1d':
-            # Filter to last 2 hours of data
-            # Make cutoff_time timezone-aware to match hist.index
-            import pandas as pd
-            cutoff_time = pd.Timestamp.now(tz=hist.index.tz) - timedelta(hours=2)
-            hist = hist[hist.index >= cutoff_time]
-            logger.info(f"Filtered to last 2 hours: {len(hist)} candles")
-        
-        # Filter data if we requested 2wk but got 1mo
-        if period == '2wk' and yf_period == '1mo':
-            # Filter to last 2 weeks of data
-            import pandas as pd
-            cutoff_time = pd.Timestamp.now(tz=hist.index.tz) - timedelta(weeks=2)
-            hist = hist[hist.index >= cutoff_time]
-            logger.info(f"Filtered to last 2 weeks: {len(hist)} candles")
-        
-        # Add indicators
-        hist = calculate_indicators(hist)
-        
-        # Cache successful result (24 hours for yfinance to avoid rate limiting)
-        # MEMORY FIX: Evict oldest if cache is full
-        if len(_ohlcv_cache) >= MAX_CACHE_SIZE:
-            _ohlcv_cache.popitem(last=False)  # Remove oldest (FIFO)
-            _cache_expiry.popitem(last=False)
-        
-        _ohlcv_cache[cache_key] = hist
-        _cache_expiry[cache_key] = now + timedelta(hours=24)
-        
-        return hist
+        # Rate limiting - blockiert den Event-Loop nicht; HTTP-Request läuft im Thread-Pool
+        await _yf_bucket.acquire_async()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_yf_executor, _sync_yf_fetch, commodity_id, timeframe, period)
     except Exception as e:
         logger.error(f"Error fetching historical data for {commodity_id}: {e}")
         # If rate limited, try to return cached data even if expired
-        if cache_key in _ohlcv_cache:
+        stale = _ohlcv_cache.get(f"{commodity_id}_{timeframe}_{period}", allow_expired=True)
+        if stale is not None:
             logger.warning(f"Rate limited, returning stale cached data for {commodity_id}")
-            return _ohlcv_cache[cache_key]
-        return None
+        return stale
+
+
+
+# Persistenter Event-Loop im Hintergrund-Thread für synchrone Aufrufer
+_bg_loop = None
+_bg_loop_lock = threading.Lock()
+_SYNC_FETCH_TIMEOUT = 30.0  # Sekunden
+
+
+def _get_background_loop():
+    """Starte den Hintergrund-Loop beim ersten Bedarf (Daemon-Thread, läuft bis Prozessende)"""
+    global _bg_loop
+    with _bg_loop_lock:
+        if _bg_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="commodity-processor-loop", daemon=True).start()
+            _bg_loop = loop
+    return _bg_loop
+
 
+def run_in_bg(coro, timeout: float = _SYNC_FETCH_TIMEOUT):
+    """
+    Führt eine Coroutine aus synchronem Code auf dem Hintergrund-Loop aus.
+    
+    Einziger Übergang sync -> async im Modul; async Aufrufer awaiten direkt.
+    Gibt bei Timeout None zurück (Coroutine wird abgebrochen).
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeoutError:
+        future.cancel()
+        logger.error(f"Timeout in background coroutine after {timeout:.0f}s")
+        return None
 
 
 def fetch_historical_ohlcv(commodity_id: str, timeframe: str = "1d", period: str = "1mo"):
     """
     Synchronous wrapper for fetch_historical_ohlcv_async
     For backwards compatibility with synchronous code
+    
+    Alle Aufrufer im Backend nutzen fetch_historical_ohlcv_async direkt;
+    dieser Wrapper bleibt nur für echte Sync-Aufrufer (Skripte) über run_in_bg().
     """
-    import asyncio
     try:
-        # Check if we're already in an event loop
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # We're in an async context - return a future
-            logger.warning("fetch_historical_ohlcv called from async context - use fetch_historical_ohlcv_async instead")
-            # Create a new thread to run the async function
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, fetch_historical_ohlcv_async(commodity_id, timeframe, period))
-                return future.result()
-        else:
-            # We're in a sync context - use asyncio.run
-            return asyncio.run(fetch_historical_ohlcv_async(commodity_id, timeframe, period))
+        asyncio.get_running_loop()
+        logger.warning("fetch_historical_ohlcv called from async context - use fetch_historical_ohlcv_async instead")
     except RuntimeError:
-        # No event loop - use asyncio.run
-        return asyncio.run(fetch_historical_ohlcv_async(commodity_id, timeframe, period))
+        pass  # Kein laufender Loop - normaler synchroner Aufruf
+    
+    return run_in_bg(fetch_historical_ohlcv_async(commodity_id, timeframe, period))
+
+
+_INDICATOR_COLUMNS = ('SMA_20', 'EMA_20', 'RSI', 'MACD', 'MACD_signal', 'MACD_histogram')
+
+# Ergebnis-Cache für calculate_indicators(..., cache_key=...) - speichert nur die Indikator-Arrays
+_INDICATOR_CACHE_SIZE = 256
+_INDICATOR_CACHE_TTL = 24 * 60 * 60
+_indicator_cache = _TTLCache(_INDICATOR_CACHE_SIZE)
 
 
-def calculate_indicators(df):
-    """Calculate technical indicators"""
+def calculate_indicators(df, cache_key: Optional[tuple] = None):
+    """
+    Calculate technical indicators
+    
+    Args:
+        df: DataFrame mit 'Close'
+        cache_key: optional, z.B. (commodity_id, timeframe) - identische Reihen
+            (gleiche Länge, letzter Zeitstempel und letzter Close) werden nicht neu berechnet
+    
+    Returns:
+        Neuer DataFrame: df plus die Indikator-Spalten (df selbst bleibt unverändert)
+    """
     try:
         # Safety check
         if df is None or df.empty:
@@ -737,78 +999,135 @@ def calculate_indicators(df):
             logger.error("DataFrame missing 'Close' column")
             return None
         
-        # SMA
-        sma_indicator = SMAIndicator(close=df['Close'], window=20)
-        df['SMA_20'] = sma_indicator.sma_indicator()
+        # Close nur einmal aus dem Frame holen - alle Pfade rechnen auf diesem Buffer
+        close = np.ascontiguousarray(df['Close'].to_numpy(dtype=np.float64))
         
-        # EMA
-        ema_indicator = EMAIndicator(close=df['Close'], window=20)
-        df['EMA_20'] = ema_indicator.ema_indicator()
+        if cache_key is None:
+            return _attach_indicators(df, _indicator_values(close))
         
-        # RSI
-        rsi_indicator = RSIIndicator(close=df['Close'], window=14)
-        df['RSI'] = rsi_indicator.rsi()
-        
-        # MACD
-        macd = MACD(close=df['Close'])
-        df['MACD'] = macd.macd()
-        df['MACD_signal'] = macd.macd_signal()
-        df['MACD_histogram'] = macd.macd_diff()
-        
-        return df
+        full_key = (cache_key, len(close), df.index[-1], float(close[-1]))
+        values = _indicator_cache.get(full_key)
+        if values is None:
+            values = _indicator_values(close)
+            _indicator_cache.set(full_key, values, _INDICATOR_CACHE_TTL)
+        return _attach_indicators(df, values)
     except Exception as e:
         logger.error(f"Error calculating indicators: {e}")
         return None  # Return None on error instead of broken df
 
 
+def _attach_indicators(df, values):
+    """
+    Hängt die sechs Indikator-Arrays in einem Schritt als ein float64-Block an
+    
+    Statt sechs einzelner df[...] = ... (je ein neuer Block) - vorhandene
+    Indikator-Spalten werden ersetzt. Die Arrays werden dabei kopiert.
+    """
+    new = pd.DataFrame(np.column_stack(values), index=df.index, columns=_INDICATOR_COLUMNS)
+    existing = df.columns.intersection(_INDICATOR_COLUMNS)
+    if len(existing):
+        df = df.drop(columns=existing)
+    return pd.concat([df, new], axis=1, copy=False)
+
+
+def _indicator_values(close):
+    """Die sechs Indikator-Arrays (Reihenfolge _INDICATOR_COLUMNS) für ein float64-Close-Array"""
+    if NUMBA_AVAILABLE:
+        # Kompilierte Kernels - gleiche Werte wie ta, ohne pandas-Overhead
+        # Ein Durchlauf über Close für alle sechs Spalten
+        return indicator_kernels.all_indicators(close, 20, 20, 14, 12, 26, 9)
+    
+    if SCIPY_AVAILABLE and len(close) and not np.isnan(close).any():
+        # Vektorisiert über das ndarray (cumsum + IIR-Filter) statt ta/pandas
+        return indicator_kernels.all_indicators_np(close, 20, 20, 14, 12, 26, 9)
+    
+    # Fallback: ta (Reihen mit Lücken) - eine Series für alle Indikatoren
+    close_series = pd.Series(close, copy=False)
+    
+    # SMA
+    sma_indicator = SMAIndicator(close=close_series, window=20)
+    
+    # EMA
+    ema_indicator = EMAIndicator(close=close_series, window=20)
+    
+    # RSI
+    rsi_indicator = RSIIndicator(close=close_series, window=14)
+    
+    # MACD
+    macd = MACD(close=close_series)
+    
+    return tuple(series.to_numpy(dtype=np.float64) for series in (
+        sma_indicator.sma_indicator(),
+        ema_indicator.ema_indicator(),
+        rsi_indicator.rsi(),
+        macd.macd(),
+        macd.macd_signal(),
+        macd.macd_diff(),
+    ))
+
+
+_SIGNAL_NAMES = ("HOLD", "BUY", "SELL")
+_TREND_NAMES = ("NEUTRAL", "UP", "DOWN")
+
+
+def _as_float(value) -> float:
+    """Indikatorwert als float - fehlend/None/NA wird NaN"""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
 def generate_signal(latest_data):
     """Generate trading signal based on indicators - REALISTISCHE Strategie"""
     try:
-        rsi = latest_data.get('RSI')
-        macd = latest_data.get('MACD')
-        macd_signal = latest_data.get('MACD_signal')
-        price = latest_data.get('Close')
-        ema = latest_data.get('EMA_20')
-        sma = latest_data.get('SMA_20')
-        
-        if pd.isna(rsi) or pd.isna(macd) or pd.isna(macd_signal):
-            return "HOLD", "NEUTRAL"
-        
-        # Determine trend
-        trend = "NEUTRAL"
-        if not pd.isna(ema) and not pd.isna(price):
-            if price > ema * 1.002:
-                trend = "UP"
-            elif price < ema * 0.998:
-                trend = "DOWN"
-        
-        # REALISTISCHE TRADING STRATEGIE
-        signal = "HOLD"
-        
-        # BUY Bedingungen (konservativ):
-        # 1. RSI überverkauft UND positives MACD Momentum
-        if rsi < 35 and macd > macd_signal:
-            signal = "BUY"
-        
-        # 2. Starker Aufwärtstrend mit Bestätigung
-        elif trend == "UP" and rsi < 60 and macd > macd_signal:
-            signal = "BUY"
-        
-        # SELL Bedingungen (konservativ):
-        # 1. RSI überkauft UND negatives MACD Momentum
-        elif rsi > 65 and macd < macd_signal:
-            signal = "SELL"
-        
-        # 2. Starker Abwärtstrend mit Bestätigung
-        elif trend == "DOWN" and rsi > 40 and macd < macd_signal:
-            signal = "SELL"
-        
-        return signal, trend
+        # REALISTISCHE TRADING STRATEGIE (Regeln in indicator_kernels.signal_rules):
+        # BUY:  RSI < 35 und MACD > Signal, oder Aufwärtstrend mit RSI < 60 und MACD > Signal
+        # SELL: RSI > 65 und MACD < Signal, oder Abwärtstrend mit RSI > 40 und MACD < Signal
+        # Trend: Preis > EMA_20 * 1.002 -> UP, Preis < EMA_20 * 0.998 -> DOWN
+        signal, trend = indicator_kernels.signal_rules(
+            _as_float(latest_data.get('RSI')),
+            _as_float(latest_data.get('MACD')),
+            _as_float(latest_data.get('MACD_signal')),
+            _as_float(latest_data.get('Close')),
+            _as_float(latest_data.get('EMA_20')),
+        )
+        return _SIGNAL_NAMES[signal], _TREND_NAMES[trend]
     except Exception as e:
         logger.error(f"Error generating signal: {e}")
         return "HOLD", "NEUTRAL"
 
 
+# Offene Positionen pro Plattform kurz cachen - parallele Signal-Auswertungen
+# teilen sich einen MT5-Roundtrip statt je einen eigenen zu machen
+_POSITIONS_TTL = 2.0  # Sekunden
+_positions_cache = _TTLCache(16)
+_positions_locks = {}
+
+
+def invalidate_open_positions_cache():
+    """Gecachte Positionen verwerfen - nach jeder platzierten oder geschlossenen Order
+    
+    Wird vom MetaAPI-SDK-Connector aufgerufen. Der kennt nur seine Account-ID, nicht den
+    Plattform-Namen (inkl. Legacy-Aliasse) unter dem gecacht wurde - daher alle Plattformen.
+    """
+    _positions_cache.clear()
+
+
+async def _get_open_positions_cached(multi_platform_connector, platform: str) -> list:
+    """get_open_positions(platform) mit 2s-TTL; gleichzeitige Aufrufer warten auf einen Request"""
+    if platform not in _positions_locks:
+        _positions_locks[platform] = asyncio.Lock()
+    async with _positions_locks[platform]:
+        positions = _positions_cache.get(platform)
+        if positions is None:
+            positions = await multi_platform_connector.get_open_positions(platform)
+            _positions_cache.set(platform, positions, _POSITIONS_TTL)
+        return positions
+
+
 async def calculate_position_size(balance: float, price: float, db, max_risk_percent: float = 20.0, free_margin: float = None, platform: str = "MT5", multi_platform_connector=None) -> float:
     """Calculate position size ensuring max portfolio risk per platform and considering free margin
     
@@ -818,22 +1137,23 @@ async def calculate_position_size(balance: float, price: float, db, max_risk_per
     try:
         # WICHTIG: Hole offene Trades LIVE von MT5, nicht aus der lokalen DB!
         # Die DB enthält keine offenen Trades mehr - sie werden nur live abgerufen
-        open_trades = []
         total_exposure = 0.0
         
         # Versuche live Positionen von MT5 zu holen
         if multi_platform_connector:
             try:
                 # Hole live Positionen von MT5
-                positions = await multi_platform_connector.get_open_positions(platform)
+                positions = await _get_open_positions_cached(multi_platform_connector, platform)
                 
                 # Berechne Exposure von allen offenen Positionen
-                for pos in positions:
-                    entry_price = pos.get('price_open', 0) or pos.get('openPrice', 0)
-                    volume = pos.get('volume', 0)
-                    if entry_price and volume:
-                        # Exposure = Entry Price * Volume (in Lots)
-                        total_exposure += entry_price * volume
+                # Exposure = Summe Entry Price * Volume (in Lots) - als Skalarprodukt
+                count = len(positions)
+                entry_prices = np.fromiter(
+                    (pos.get('price_open', 0) or pos.get('openPrice', 0) or 0 for pos in positions),
+                    dtype=np.float64, count=count
+                )
+                volumes = np.fromiter((pos.get('volume', 0) or 0 for pos in positions), dtype=np.float64, count=count)
+                total_exposure = float(entry_prices @ volumes)
                 
                 logger.info(f"📊 [{platform}] Found {len(positions)} open positions, Total Exposure: {total_exposure:.2f} EUR")
                 
@@ -843,10 +1163,10 @@ async def calculate_position_size(balance: float, price: float, db, max_risk_per
         # Fallback: Versuche aus DB (für Backward-Kompatibilität oder wenn kein connector)
         if total_exposure == 0:
             try:
-                open_trades = await db.trades.find({"status": "OPEN", "platform": platform}).to_list(100)
-                total_exposure = sum([trade.get('entry_price', 0) * trade.get('quantity', 0) for trade in open_trades])
+                # Summe wird in SQL gebildet (Index status, platform) statt Trades zu laden
+                total_exposure = await db.trades.sum_open_exposure(platform)
                 if total_exposure > 0:
-                    logger.info(f"📊 [{platform}] Fallback to DB: {len(open_trades)} open trades, Exposure: {total_exposure:.2f}")
+                    logger.info(f"📊 [{platform}] Fallback to DB: Exposure: {total_exposure:.2f}")
             except Exception as e:
                 logger.debug(f"DB fallback failed: {e}")
                 pass
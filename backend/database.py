@@ -5,13 +5,24 @@ Ersetzt MongoDB mit einer lokalen SQLite Datenbank
 
 import sqlite3
 import aiosqlite
+import asyncio
+import contextvars
 import json
 import logging
+from collections import namedtuple
+from contextlib import asynccontextmanager
 from pathlib import Path
+from urllib.parse import quote
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 import os
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Datenbankpfad - NIEMALS im App-Bundle (read-only unter macOS!)
@@ -52,225 +63,618 @@ def get_current_db_path():
         DB_PATH = get_db_path()
     return DB_PATH
 
+# Spalten für INSERTs - einmal definiert, von insert_one und insert_many genutzt
+_TRADE_FIELDS = ('id', 'timestamp', 'commodity', 'type', 'price', 'quantity',
+                 'status', 'platform', 'entry_price', 'exit_price', 'profit_loss',
+                 'stop_loss', 'take_profit', 'strategy_signal', 'closed_at',
+                 'mt5_ticket', 'strategy', 'opened_at', 'opened_by', 'closed_by',
+                 'close_reason')
+_HISTORY_FIELDS = ('commodity_id', 'timestamp', 'price', 'volume', 'sma_20', 'ema_20',
+                   'rsi', 'macd', 'macd_signal', 'macd_histogram', 'trend', 'signal')
+
+_INSERT_TRADE_SQL = f"INSERT INTO trades ({','.join(_TRADE_FIELDS)}) VALUES ({','.join('?' * len(_TRADE_FIELDS))})"
+_INSERT_HISTORY_SQL = (f"INSERT INTO market_data_history ({','.join(_HISTORY_FIELDS)}) "
+                       f"VALUES ({','.join('?' * len(_HISTORY_FIELDS))})")
+
+_MARKET_DATA_FIELDS = ('commodity', 'timestamp', 'price', 'volume', 'sma_20', 'ema_20', 'rsi',
+                       'macd', 'macd_signal', 'macd_histogram', 'trend', 'signal', 'data_source')
+# NOT NULL-Spalten von market_data - nur mit beiden ist ein Upsert in einem Statement möglich
+_MARKET_DATA_REQUIRED = frozenset(('timestamp', 'price'))
+# CRITICAL: SET-Reihenfolge bei trade_settings immer stop_loss vor take_profit
+_TRADE_SETTINGS_UPDATE_ORDER = ('stop_loss', 'take_profit', 'strategy', 'entry_price', 'created_at',
+                                'platform', 'commodity', 'created_by', 'status', 'type')
+
+# Erlaubte Sortierfelder pro Tabelle - ORDER BY kann nicht gebunden werden
+TRADE_COLUMNS = frozenset(_TRADE_FIELDS)
+TRADE_SETTINGS_COLUMNS = frozenset(('trade_id', 'stop_loss', 'take_profit', 'strategy',
+                                    'created_at', 'entry_price', 'platform', 'commodity',
+                                    'created_by', 'status', 'type'))
+HISTORY_COLUMNS = frozenset(('id',) + _HISTORY_FIELDS)
+
+# JSON-Funktionen (json_set) sind ab SQLite 3.38 fest eingebaut
+_JSON_SET_SUPPORTED = sqlite3.sqlite_version_info >= (3, 38, 0)
+# (Pfad, Wert)-Paare pro json_set-Aufruf (SQLITE_MAX_FUNCTION_ARG = 127)
+_JSON_SET_MAX_PAIRS = 63
+
+# Settings-JSON größer als das wird im Thread geparst statt im Event-Loop
+_JSON_OFFLOAD_SIZE = 64 * 1024
+
+# Verbindungs-Tuning
+_MMAP_SIZE = 256 * 1024 * 1024
+_OPTIMIZE_INTERVAL = 15 * 60  # Sekunden
+
+# Bulk-Inserts: Zeilen pro Transaktion
+_BULK_CHUNK_SIZE = 10000
+
+
+# Spaltennamen pro Tabelle (PRAGMA table_info nach dem Schema-Init) - spart
+# cursor.description pro Abfrage; Reihenfolge wie bei SELECT *
+_COLUMNS_CACHE: Dict[str, tuple] = {}
+
+# WHERE-Templates pro Abfrage-Form: (Tabelle, ((Feld, Operator, ggf. Anzahl), ...)) -> SQL
+_WHERE_TEMPLATES: Dict[tuple, str] = {}
+_WHERE_TEMPLATES_MAX = 512
+
+# Database, deren transaction() der aktuelle Task gerade hält (für Database.reader);
+# darin gestartete Tasks erben den Kontext und gehören zur Transaktion
+_TRANSACTION_OWNER: contextvars.ContextVar = contextvars.ContextVar('_TRANSACTION_OWNER', default=None)
+
+# Namedtuple-Klassen pro Tabelle für to_namedtuple_list
+_ROW_TYPES: Dict[str, type] = {}
+
+
+def _build_where(table: str, query: dict, operators: tuple = ('$gte', '$in')):
+    """
+    WHERE-Klausel und Parameter für eine MongoDB-artige Query ($gte, $in, Gleichheit)
+    
+    Das SQL hängt nur von der Form der Query ab und wird pro Form gecacht;
+    pro Aufruf werden nur noch die Parameter gesammelt.
+    """
+    shape = []
+    values = []
+    for key, value in query.items():
+        if isinstance(value, dict):
+            # Handle operators
+            for op, op_value in value.items():
+                if op not in operators:
+                    continue
+                if op == '$gte':
+                    shape.append((key, op))
+                    values.append(op_value.isoformat() if isinstance(op_value, datetime) else op_value)
+                elif op == '$in':
+                    shape.append((key, op, len(op_value)))
+                    values.extend(op_value)
+        else:
+            shape.append((key,))
+            values.append(value)
+    
+    template_key = (table, tuple(shape))
+    where_clause = _WHERE_TEMPLATES.get(template_key)
+    if where_clause is None:
+        where_parts = []
+        for part in shape:
+            if len(part) == 1:
+                where_parts.append(f"{part[0]} = ?")
+            elif part[1] == '$gte':
+                where_parts.append(f"{part[0]} >= ?")
+            else:
+                # Support $in operator: key IN (?, ?, ?)
+                where_parts.append(f"{part[0]} IN ({','.join('?' * part[2])})")
+        where_clause = " AND ".join(where_parts) if where_parts else "1=1"
+        if len(_WHERE_TEMPLATES) < _WHERE_TEMPLATES_MAX:
+            _WHERE_TEMPLATES[template_key] = where_clause
+    return where_clause, values
+
+
+# Projektionen: (Tabelle, frozenset(projection.items())) -> Spalten-Tupel
+_PROJECTION_CACHE: Dict[tuple, Optional[tuple]] = {}
+
+
+def _projected_columns(table: str, projection: Optional[dict]) -> Optional[tuple]:
+    """
+    Spaltenliste für eine MongoDB-Projektion ({feld: 1} bzw. {feld: 0})
+    
+    Feldnamen werden gegen die echten Tabellenspalten (_COLUMNS_CACHE) geprüft,
+    unbekannte ignoriert. None bedeutet SELECT * (keine/leere Projektion).
+    """
+    columns = _COLUMNS_CACHE.get(table)
+    if not projection or not columns:
+        return None
+    
+    cache_key = (table, frozenset(projection.items()))
+    if cache_key in _PROJECTION_CACHE:
+        return _PROJECTION_CACHE[cache_key]
+    
+    included = {field for field, flag in projection.items() if flag and field != '_id'}
+    if included:
+        selected = tuple(col for col in columns if col in included)
+    else:
+        excluded = {field for field, flag in projection.items() if not flag}
+        selected = tuple(col for col in columns if col not in excluded)
+    
+    result = selected if selected and selected != columns else None
+    _PROJECTION_CACHE[cache_key] = result
+    return result
+
+
+# UPSERT/UPDATE-Statements pro (Art, Tabelle, Schlüssel, Felder) - gleicher SQL-Text
+# für gleiche $set-Form, damit SQLite das vorbereitete Statement wiederverwendet
+_UPSERT_SQL: Dict[tuple, str] = {}
+
+
+def _upsert_sql(table: str, key: str, fields: tuple, insert_fields: tuple = None) -> str:
+    """
+    INSERT ... ON CONFLICT(key) DO UPDATE - aktualisiert nur die übergebenen Felder
+    
+    insert_fields: Spalten für den INSERT-Teil (Standard: fields). Fehlende Spalten
+    bekommen sonst ihren DEFAULT statt NULL.
+    """
+    cache_key = ('upsert', table, key, fields, insert_fields)
+    sql = _UPSERT_SQL.get(cache_key)
+    if sql is None:
+        columns = (key,) + (insert_fields or fields)
+        if fields:
+            conflict = "DO UPDATE SET " + ", ".join(f"{field} = excluded.{field}" for field in fields)
+        else:
+            conflict = "DO NOTHING"
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT({key}) {conflict}")
+        _UPSERT_SQL[cache_key] = sql
+    return sql
+
+
+def _update_sql(table: str, key: str, fields: tuple) -> str:
+    """UPDATE ... WHERE key = ? für die übergebenen Felder (ohne Upsert)"""
+    cache_key = ('update', table, key, fields)
+    sql = _UPSERT_SQL.get(cache_key)
+    if sql is None:
+        sql = f"UPDATE {table} SET {', '.join(f'{field} = ?' for field in fields)} WHERE {key} = ?"
+        _UPSERT_SQL[cache_key] = sql
+    return sql
+
+
+def _json_dumps(value) -> str:
+    """JSON-Text für SQLite (orjson liefert bytes - als BLOB würde json_set scheitern)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value)
+
+
+def _json_loads(text):
+    return orjson.loads(text) if ORJSON_AVAILABLE else json.loads(text)
+
+
+async def _json_loads_async(text):
+    """Große Dokumente im Thread parsen, damit der Event-Loop nicht blockiert"""
+    if len(text) > _JSON_OFFLOAD_SIZE:
+        return await asyncio.to_thread(_json_loads, text)
+    return _json_loads(text)
+
+
+def _checked_sort_field(field: str, allowed: frozenset) -> Optional[str]:
+    """
+    Sortierfeld gegen die Spalten-Whitelist prüfen (wird direkt ins SQL eingesetzt)
+    
+    Unbekannte Felder werden geloggt und ignoriert (None = kein ORDER BY).
+    """
+    if field not in allowed:
+        logger.warning(f"Ungültiges Sortierfeld ignoriert: {field!r}")
+        return None
+    return field
+
+
+def _row_type(table: str, columns: tuple) -> type:
+    """namedtuple-Klasse für table, einmal pro Tabelle erzeugt"""
+    row_type = _ROW_TYPES.get(table)
+    if row_type is None or row_type._fields != tuple(columns):
+        row_type = namedtuple(f"{table.title().replace('_', '')}Row", columns)
+        _ROW_TYPES[table] = row_type
+    return row_type
+
+
+def _prepare_trade_row(data: dict) -> list:
+    """ID ergänzen, datetime -> ISO-String, Werte in _TRADE_FIELDS-Reihenfolge"""
+    if 'id' not in data:
+        import uuid
+        data['id'] = str(uuid.uuid4())
+    
+    for key in ['timestamp', 'closed_at', 'opened_at']:
+        if key in data and isinstance(data[key], datetime):
+            data[key] = data[key].isoformat()
+    
+    return [data.get(f) for f in _TRADE_FIELDS]
+
+
+def _prepare_history_row(data: dict) -> list:
+    values = [data.get(f) for f in _HISTORY_FIELDS]
+    if isinstance(values[1], datetime):
+        values[1] = values[1].isoformat()
+    return values
+
+
 class Database:
-    """SQLite Database Manager mit async Support"""
+    """SQLite Database Manager mit async Support
+    
+    Single-DB-Fallback: zur Laufzeit aktiv nur, wenn database_v2 nicht importiert
+    werden kann (siehe MULTI-DATABASE INTEGRATION am Dateiende). Transaktionen,
+    Schreib-Lock, Lese-Verbindung und Spalten-Cache gelten nur für diesen Pfad.
+    """
     
     def __init__(self, db_path: str = None):
         # Hole DB-Pfad zur Laufzeit, nicht beim Import!
         self.db_path = db_path if db_path else get_current_db_path()
         self._conn = None
-        self._lock = None  # V2.3.30: asyncio.Lock für Thread-Safety
+        # Zweite, read-only Verbindung für reine SELECTs - im WAL-Modus liest
+        # sie einen konsistenten Snapshot, ohne auf den Writer zu warten
+        self._read_conn = None
+        # Serialisiert alle Schreibzugriffe auf der Verbindung - verhindert
+        # SQLITE_BUSY auf App-Seite statt mit Retry-Schleifen
+        self._write_lock = asyncio.Lock()
+        self._optimize_task = None
         logger.info(f"🗄️  Database initialized with path: {self.db_path}")
         
     async def connect(self):
         """Verbindung zur Datenbank herstellen mit optimierten Settings"""
-        import asyncio
         try:
-            # V2.3.30: Create async lock for thread-safety
-            if self._lock is None:
-                self._lock = asyncio.Lock()
-            
             self._conn = await aiosqlite.connect(
                 self.db_path,
-                timeout=120.0,  # V2.3.30: Erhöht auf 120 Sekunden
+                timeout=5.0,  # Schreibzugriffe sind per _write_lock serialisiert
                 isolation_level=None  # V2.3.30: Autocommit mode für bessere Concurrency
             )
             # Enable WAL mode for better concurrency
             await self._conn.execute("PRAGMA journal_mode=WAL")
             # Enable foreign keys
             await self._conn.execute("PRAGMA foreign_keys = ON")
-            # V2.3.30: Erhöhter busy_timeout auf 120 Sekunden
-            await self._conn.execute("PRAGMA busy_timeout = 120000")
+            # 5s reichen - Konkurrenz nur noch durch andere Prozesse
+            await self._conn.execute("PRAGMA busy_timeout = 5000")
             # Synchronous mode = NORMAL for better performance with WAL
             await self._conn.execute("PRAGMA synchronous = NORMAL")
             # V2.3.30: Größerer Cache für bessere Performance
             await self._conn.execute("PRAGMA cache_size = -64000")  # 64MB Cache
             # V2.3.30: Temp Store im Memory
             await self._conn.execute("PRAGMA temp_store = MEMORY")
+            # Seiten per mmap lesen statt pread-Syscall pro Seite (256MB)
+            await self._conn.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+            await self._conn.execute("PRAGMA wal_autocheckpoint = 1000")
             await self._conn.commit()
-            logger.info(f"✅ SQLite verbunden (WAL mode, 120s timeout, 64MB cache): {self.db_path}")
+            
+            await self._connect_reader()
+            
+            # Planer-Statistiken periodisch aktualisieren (market_data_history wächst)
+            self._optimize_task = asyncio.create_task(self._optimize_loop())
+            logger.info(f"✅ SQLite verbunden (WAL mode, 5s timeout, 64MB cache, 256MB mmap): {self.db_path}")
             return self._conn
         except Exception as e:
             logger.error(f"❌ SQLite Verbindung fehlgeschlagen: {e}")
             raise
     
+    async def _connect_reader(self):
+        """Read-only Verbindung öffnen (gleiche PRAGMAs außer journal_mode/synchronous)"""
+        if self.db_path == ':memory:':
+            return
+        try:
+            self._read_conn = await aiosqlite.connect(
+                f"file:{quote(Path(self.db_path).resolve().as_posix())}?mode=ro",
+                uri=True,
+                timeout=5.0,
+                isolation_level=None
+            )
+            await self._read_conn.execute("PRAGMA busy_timeout = 5000")
+            await self._read_conn.execute("PRAGMA cache_size = -64000")
+            await self._read_conn.execute("PRAGMA temp_store = MEMORY")
+            await self._read_conn.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+        except Exception as e:
+            logger.warning(f"⚠️ Read-only Verbindung nicht verfügbar, lese über Writer: {e}")
+            self._read_conn = None
+    
+    def _owns_transaction(self) -> bool:
+        """True, wenn der aktuelle Task gerade transaction() dieser Datenbank hält"""
+        return _TRANSACTION_OWNER.get() is self
+    
+    @property
+    def reader(self):
+        """
+        Verbindung für reine SELECTs
+        
+        Nur der Task, der gerade transaction() hält, liest über den Writer - er
+        muss seine eigenen ungecommitteten Änderungen sehen. Alle anderen Tasks
+        lesen den letzten Commit über die read-only Verbindung.
+        """
+        if self._read_conn is None or self._owns_transaction():
+            return self._conn
+        return self._read_conn
+    
     async def execute_with_retry(self, query: str, params: tuple = None, max_retries: int = 5):
-        """V2.3.30: Execute query with retry on database locked error"""
-        import asyncio
-        last_error = None
+        """
+        Execute write query (V2.3.30 API)
+        
+        Schreibzugriffe laufen serialisiert unter _write_lock - ein Retry bei
+        "database is locked" ist nicht mehr nötig; max_retries wird ignoriert.
+        """
+        async with self.write():
+            if params:
+                return await self._conn.execute(query, params)
+            return await self._conn.execute(query)
+    
+    @asynccontextmanager
+    async def write(self, auto_commit: bool = True):
+        """
+        Rahmen für einen Schreibzugriff: hält _write_lock und committet danach
+        
+        Mit auto_commit=False oder innerhalb der eigenen transaction() (Lock
+        gehalten, Commit am Ende der Transaktion) nur durchreichen - _write_lock
+        ist nicht reentrant.
+        """
+        if not auto_commit or self._owns_transaction():
+            yield
+            return
+        async with self._write_lock:
+            yield
+            await self._conn.commit()
+    
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Gruppiert mehrere Schreibzugriffe in eine Transaktion (BEGIN IMMEDIATE)
+        
+        Ein Commit (WAL-fsync) beim Verlassen statt einem pro Statement, Rollback
+        bei Exception. Schreibmethoden darin schließen sich der Transaktion an
+        (auch mit auto_commit=True), verschachtelte transaction() ebenso:
         
-        for attempt in range(max_retries):
+            async with db.transaction():
+                await trades.insert_one(trade)
+                await market_data.update_one(query, update, upsert=True)
+        """
+        if self._owns_transaction():
+            yield self
+            return
+        async with self._write_lock:
+            await self._conn.execute("BEGIN IMMEDIATE")
+            owner_token = _TRANSACTION_OWNER.set(self)
             try:
-                async with self._lock:
-                    if params:
-                        result = await self._conn.execute(query, params)
-                    else:
-                        result = await self._conn.execute(query)
+                yield self
+            except BaseException:
+                await self._conn.rollback()
+                raise
+            finally:
+                _TRANSACTION_OWNER.reset(owner_token)
+            await self._conn.commit()
+    
+    async def executemany_in_chunks(self, sql: str, rows: list, auto_commit: bool = True) -> int:
+        """
+        Führt sql für alle rows aus - je _BULK_CHUNK_SIZE Zeilen in einer Transaktion
+        (ein Prepare und ein Commit pro Chunk statt pro Zeile)
+        
+        Mit auto_commit=False bzw. in der eigenen transaction() ohne eigenes
+        BEGIN/COMMIT in der Transaktion des Aufrufers.
+        """
+        if not auto_commit or self._owns_transaction():
+            await self._conn.executemany(sql, rows)
+            return len(rows)
+        
+        for start in range(0, len(rows), _BULK_CHUNK_SIZE):
+            chunk = rows[start:start + _BULK_CHUNK_SIZE]
+            async with self._write_lock:
+                await self._conn.execute("BEGIN")
+                try:
+                    await self._conn.executemany(sql, chunk)
                     await self._conn.commit()
-                    return result
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e):
-                    last_error = e
-                    wait_time = 0.5 * (attempt + 1)  # Exponential backoff
-                    logger.warning(f"⚠️ Database locked (attempt {attempt + 1}/{max_retries}), waiting {wait_time}s...")
-                    await asyncio.sleep(wait_time)
-                else:
+                except Exception:
+                    await self._conn.rollback()
                     raise
+        return len(rows)
+    
+    async def _optimize_loop(self):
+        """PRAGMA optimize alle _OPTIMIZE_INTERVAL Sekunden"""
+        while True:
+            await asyncio.sleep(_OPTIMIZE_INTERVAL)
+            try:
+                async with self.write():
+                    await self._conn.execute("PRAGMA optimize")
             except Exception as e:
-                raise
-        
-        logger.error(f"❌ Database still locked after {max_retries} attempts")
-        raise last_error
+                logger.warning(f"PRAGMA optimize fehlgeschlagen: {e}")
     
     async def close(self):
         """Verbindung schließen"""
+        if self._optimize_task:
+            self._optimize_task.cancel()
+            self._optimize_task = None
         if self._conn:
+            try:
+                async with self.write():
+                    await self._conn.execute("PRAGMA optimize")
+            except Exception as e:
+                logger.warning(f"PRAGMA optimize fehlgeschlagen: {e}")
             await self._conn.close()
             self._conn = None
             logger.info("SQLite Verbindung geschlossen")
+        if self._read_conn:
+            await self._read_conn.close()
+            self._read_conn = None
+    
+    async def load_table_columns(self):
+        """Spaltennamen der Collections-Tabellen einmalig in _COLUMNS_CACHE laden"""
+        for table in ('trades', 'trade_settings', 'market_data', 'market_data_history'):
+            async with self._conn.execute(f"PRAGMA table_info({table})") as cursor:
+                _COLUMNS_CACHE[table] = tuple(row[1] for row in await cursor.fetchall())
     
     async def initialize_schema(self):
         """Erstelle alle benötigten Tabellen"""
         try:
             logger.info("Erstelle SQLite Schema...")
             
-            # Trading Settings
-            await self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS trading_settings (
-                    id TEXT PRIMARY KEY,
-                    data TEXT NOT NULL,
-                    updated_at TEXT NOT NULL
-                )
-            """)
-            
-            # Trades
-            await self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS trades (
-                    id TEXT PRIMARY KEY,
-                    timestamp TEXT NOT NULL,
-                    commodity TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    price REAL NOT NULL,
-                    quantity REAL DEFAULT 1.0,
-                    status TEXT DEFAULT 'OPEN',
-                    platform TEXT DEFAULT 'MT5_LIBERTEX',
-                    entry_price REAL NOT NULL,
-                    exit_price REAL,
-                    profit_loss REAL,
-                    stop_loss REAL,
-                    take_profit REAL,
-                    strategy_signal TEXT,
-                    closed_at TEXT,
-                    mt5_ticket TEXT,
-                    strategy TEXT,
-                    opened_at TEXT,
-                    opened_by TEXT,
-                    closed_by TEXT,
-                    close_reason TEXT
-                )
-            """)
-            
-            # Trade Settings
-            await self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS trade_settings (
-                    trade_id TEXT PRIMARY KEY,
-                    stop_loss REAL,
-                    take_profit REAL,
-                    strategy TEXT,
-                    created_at TEXT,
-                    entry_price REAL,
-                    platform TEXT,
-                    commodity TEXT,
-                    created_by TEXT,
-                    status TEXT DEFAULT 'OPEN',
-                    type TEXT
-                )
-            """)
-            
-            # Add missing columns to existing tables
-            try:
-                await self._conn.execute("ALTER TABLE trade_settings ADD COLUMN status TEXT DEFAULT 'OPEN'")
-            except:
-                pass  # Column already exists
-            
-            try:
-                await self._conn.execute("ALTER TABLE trade_settings ADD COLUMN type TEXT")
-            except:
-                pass  # Column already exists
-            
-            # Market Data (Latest) - V2.3.30: Added data_source column
-            await self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS market_data (
-                    commodity TEXT PRIMARY KEY,
-                    timestamp TEXT NOT NULL,
-                    price REAL NOT NULL,
-                    volume REAL,
-                    sma_20 REAL,
-                    ema_20 REAL,
-                    rsi REAL,
-                    macd REAL,
-                    macd_signal REAL,
-                    macd_histogram REAL,
-                    trend TEXT,
-                    signal TEXT,
-                    data_source TEXT
-                )
-            """)
-            
-            # V2.3.30: Add data_source column to existing market_data table
-            try:
-                await self._conn.execute("ALTER TABLE market_data ADD COLUMN data_source TEXT")
-                logger.info("✅ Added data_source column to market_data table")
-            except:
-                pass  # Column already exists
-            
-            # Market Data History
-            await self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS market_data_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    commodity_id TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    price REAL NOT NULL,
-                    volume REAL,
-                    sma_20 REAL,
-                    ema_20 REAL,
-                    rsi REAL,
-                    macd REAL,
-                    macd_signal REAL,
-                    macd_histogram REAL,
-                    trend TEXT,
-                    signal TEXT
-                )
-            """)
-            
-            # API Keys
-            await self._conn.execute("""
-                CREATE TABLE IF NOT EXISTS api_keys (
-                    id TEXT PRIMARY KEY,
-                    metaapi_token TEXT,
-                    metaapi_account_id TEXT,
-                    metaapi_icmarkets_account_id TEXT,
-                    bitpanda_api_key TEXT,
-                    bitpanda_email TEXT,
-                    finnhub_api_key TEXT,
-                    updated_at TEXT NOT NULL
-                )
-            """)
-            
-            # Indexes für Performance
-            await self._conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status)
-            """)
-            
-            await self._conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_trades_mt5_ticket ON trades(mt5_ticket)
-            """)
+            # Eine Transaktion für alle DDL-Statements statt je ein impliziter Commit
+            async with self.transaction():
+                # Trading Settings
+                await self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS trading_settings (
+                        id TEXT PRIMARY KEY,
+                        data TEXT NOT NULL,
+                        updated_at TEXT NOT NULL
+                    )
+                """)
+                
+                # Trades
+                await self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS trades (
+                        id TEXT PRIMARY KEY,
+                        timestamp TEXT NOT NULL,
+                        commodity TEXT NOT NULL,
+                        type TEXT NOT NULL,
+                        price REAL NOT NULL,
+                        quantity REAL DEFAULT 1.0,
+                        status TEXT DEFAULT 'OPEN',
+                        platform TEXT DEFAULT 'MT5_LIBERTEX',
+                        entry_price REAL NOT NULL,
+                        exit_price REAL,
+                        profit_loss REAL,
+                        stop_loss REAL,
+                        take_profit REAL,
+                        strategy_signal TEXT,
+                        closed_at TEXT,
+                        mt5_ticket TEXT,
+                        strategy TEXT,
+                        opened_at TEXT,
+                        opened_by TEXT,
+                        closed_by TEXT,
+                        close_reason TEXT
+                    )
+                """)
+                
+                # Trade Settings
+                await self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS trade_settings (
+                        trade_id TEXT PRIMARY KEY,
+                        stop_loss REAL,
+                        take_profit REAL,
+                        strategy TEXT,
+                        created_at TEXT,
+                        entry_price REAL,
+                        platform TEXT,
+                        commodity TEXT,
+                        created_by TEXT,
+                        status TEXT DEFAULT 'OPEN',
+                        type TEXT
+                    )
+                """)
+                
+                # Add missing columns to existing tables
+                try:
+                    await self._conn.execute("ALTER TABLE trade_settings ADD COLUMN status TEXT DEFAULT 'OPEN'")
+                except:
+                    pass  # Column already exists
+                
+                try:
+                    await self._conn.execute("ALTER TABLE trade_settings ADD COLUMN type TEXT")
+                except:
+                    pass  # Column already exists
+                
+                # Market Data (Latest) - V2.3.30: Added data_source column
+                await self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS market_data (
+                        commodity TEXT PRIMARY KEY,
+                        timestamp TEXT NOT NULL,
+                        price REAL NOT NULL,
+                        volume REAL,
+                        sma_20 REAL,
+                        ema_20 REAL,
+                        rsi REAL,
+                        macd REAL,
+                        macd_signal REAL,
+                        macd_histogram REAL,
+                        trend TEXT,
+                        signal TEXT,
+                        data_source TEXT
+                    )
+                """)
+                
+                # V2.3.30: Add data_source column to existing market_data table
+                try:
+                    await self._conn.execute("ALTER TABLE market_data ADD COLUMN data_source TEXT")
+                    logger.info("✅ Added data_source column to market_data table")
+                except:
+                    pass  # Column already exists
+                
+                # Market Data History (append-only: rowid-PK ohne AUTOINCREMENT,
+                # spart den sqlite_sequence-Write pro Insert)
+                await self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS market_data_history (
+                        id INTEGER PRIMARY KEY,
+                        commodity_id TEXT NOT NULL,
+                        timestamp TEXT NOT NULL,
+                        price REAL NOT NULL,
+                        volume REAL,
+                        sma_20 REAL,
+                        ema_20 REAL,
+                        rsi REAL,
+                        macd REAL,
+                        macd_signal REAL,
+                        macd_histogram REAL,
+                        trend TEXT,
+                        signal TEXT
+                    )
+                """)
+                
+                # API Keys
+                await self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS api_keys (
+                        id TEXT PRIMARY KEY,
+                        metaapi_token TEXT,
+                        metaapi_account_id TEXT,
+                        metaapi_icmarkets_account_id TEXT,
+                        bitpanda_api_key TEXT,
+                        bitpanda_email TEXT,
+                        finnhub_api_key TEXT,
+                        updated_at TEXT NOT NULL
+                    )
+                """)
+                
+                # Indexes für Performance
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status)
+                """)
+                
+                # Covering Index: sum_open_exposure liest nur den Index, keine Tabellenzeilen
+                await self._conn.execute("DROP INDEX IF EXISTS idx_trades_status_platform")
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_open_exposure ON trades(status, platform, entry_price, quantity)
+                """)
+                
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_mt5_ticket ON trades(mt5_ticket)
+                """)
+                
+                # Zusammengesetzte Indizes passend zu WHERE + ORDER BY der Cursor
+                # (kein Full-Scan, kein separater Sortierschritt)
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_commodity_status_ts ON trades(commodity, status, timestamp DESC)
+                """)
+                
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_status_ts ON trades(status, timestamp DESC)
+                """)
+                
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trades_opened_at ON trades(opened_at)
+                """)
+                
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_trade_settings_status ON trade_settings(status)
+                """)
+                
+                # History wird neueste zuerst gelesen - ersetzt den aufsteigenden Index
+                await self._conn.execute("DROP INDEX IF EXISTS idx_market_history_commodity")
+                await self._conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_market_history_cid_ts_desc ON market_data_history(commodity_id, timestamp DESC)
+                """)
             
-            await self._conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_market_history_commodity ON market_data_history(commodity_id, timestamp)
-            """)
+            # Statistiken für den Planer und count_estimate (sqlite_stat1);
+            # analysis_limit hält ANALYZE auch bei großer History kurz
+            async with self.write():
+                await self._conn.execute("PRAGMA analysis_limit = 1000")
+                await self._conn.execute("ANALYZE")
             
-            await self._conn.commit()
+            await self.load_table_columns()
             logger.info("✅ SQLite Schema erstellt")
             
         except Exception as e:
@@ -288,43 +692,80 @@ class TradingSettings:
         """Hole Trading Settings"""
         try:
             setting_id = query.get('id', 'trading_settings')
-            async with self.db._conn.execute(
+            async with self.db.reader.execute(
                 "SELECT data FROM trading_settings WHERE id = ?",
                 (setting_id,)
             ) as cursor:
                 row = await cursor.fetchone()
                 if row:
-                    return json.loads(row[0])
+                    return await _json_loads_async(row[0])
                 return None
         except Exception as e:
             logger.error(f"Error fetching settings: {e}")
             return None
     
-    async def insert_one(self, data: dict):
+    async def insert_one(self, data: dict, auto_commit: bool = True):
         """Erstelle neue Settings"""
         try:
             setting_id = data.get('id', 'trading_settings')
-            data_json = json.dumps(data)
-            await self.db._conn.execute(
-                "INSERT INTO trading_settings (id, data, updated_at) VALUES (?, ?, ?)",
-                (setting_id, data_json, datetime.now(timezone.utc).isoformat())
-            )
-            await self.db._conn.commit()
+            data_json = _json_dumps(data)
+            async with self.db.write(auto_commit):
+                await self.db._conn.execute(
+                    "INSERT INTO trading_settings (id, data, updated_at) VALUES (?, ?, ?)",
+                    (setting_id, data_json, datetime.now(timezone.utc).isoformat())
+                )
         except Exception as e:
             logger.error(f"Error inserting settings: {e}")
             raise
     
-    async def update_one(self, query: dict, update: dict, upsert: bool = False):
-        """Update Settings with retry logic for SQLite locking"""
-        import asyncio
-        
-        max_retries = 5
-        retry_delay = 0.5
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, auto_commit: bool = True):
+        """
+        Update Settings - ein atomares Statement (json_set bzw. UPSERT) statt
+        SELECT, Merge in Python und UPDATE
+        """
+        set_data = update.get('$set', {})
+        if not _JSON_SET_SUPPORTED or any('"' in key for key in set_data):
+            return await self._update_one_read_modify_write(query, update, upsert, auto_commit)
         
-        for attempt in range(max_retries):
-            try:
-                setting_id = query.get('id', 'trading_settings')
-                
+        try:
+            setting_id = query.get('id', 'trading_settings')
+            now = datetime.now(timezone.utc).isoformat()
+            
+            # json_set ersetzt Schlüssel auf oberster Ebene wie dict.update()
+            # (json_patch würde None-Werte löschen und verschachtelte Dicts mergen).
+            # Max. 127 Funktionsargumente - ab 63 Schlüsseln json_set verschachteln
+            data_expr = "data"
+            for start in range(0, len(set_data), _JSON_SET_MAX_PAIRS):
+                count = min(_JSON_SET_MAX_PAIRS, len(set_data) - start)
+                paths = ", ".join('?, json(?)' for _ in range(count))
+                data_expr = f"json_set({data_expr}, {paths})"
+            path_values = []
+            for key, value in set_data.items():
+                path_values.extend((f'$."{key}"', _json_dumps(value)))
+            
+            async with self.db.write(auto_commit):
+                if upsert:
+                    await self.db._conn.execute(
+                        f"INSERT INTO trading_settings (id, data, updated_at) VALUES (?, ?, ?) "
+                        f"ON CONFLICT(id) DO UPDATE SET data = {data_expr}, updated_at = excluded.updated_at",
+                        [setting_id, _json_dumps({**set_data, 'id': setting_id}), now] + path_values
+                    )
+                else:
+                    await self.db._conn.execute(
+                        f"UPDATE trading_settings SET data = {data_expr}, updated_at = ? WHERE id = ?",
+                        path_values + [now, setting_id]
+                    )
+        except Exception as e:
+            logger.error(f"Error updating settings: {e}")
+            raise
+    
+    async def _update_one_read_modify_write(self, query: dict, update: dict, upsert: bool, auto_commit: bool):
+        """Update Settings per SELECT + Merge + UPDATE (SQLite < 3.38)"""
+        try:
+            setting_id = query.get('id', 'trading_settings')
+            
+            # Lesen und Schreiben unter einem Lock - kein anderer Writer dazwischen
+            async with self.db.write(auto_commit):
                 # Get current data
                 existing = await self.find_one(query)
                 
@@ -332,7 +773,7 @@ class TradingSettings:
                     # Update existing
                     if '$set' in update:
                         existing.update(update['$set'])
-                    data_json = json.dumps(existing)
+                    data_json = _json_dumps(existing)
                     await self.db._conn.execute(
                         "UPDATE trading_settings SET data = ?, updated_at = ? WHERE id = ?",
                         (data_json, datetime.now(timezone.utc).isoformat(), setting_id)
@@ -341,20 +782,10 @@ class TradingSettings:
                     # Insert new
                     new_data = update.get('$set', {})
                     new_data['id'] = setting_id
-                    await self.insert_one(new_data)
-                
-                await self.db._conn.commit()
-                break  # Success, exit retry loop
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("locked" in error_msg or "busy" in error_msg) and attempt < max_retries - 1:
-                    logger.warning(f"Database locked, retry {attempt + 1}/{max_retries}...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger.error(f"Error updating settings after {attempt + 1} attempts: {e}")
-                    raise
+                    await self.insert_one(new_data, auto_commit=False)
+        except Exception as e:
+            logger.error(f"Error updating settings: {e}")
+            raise
 
 
 class Trades:
@@ -373,211 +804,179 @@ class Trades:
         results = await cursor.to_list(1)
         return results[0] if results else None
     
-    async def insert_one(self, data: dict):
-        """Insert new trade with retry logic for SQLite locking"""
-        import asyncio
-        
-        max_retries = 5
-        retry_delay = 0.3
-        
-        for attempt in range(max_retries):
-            try:
-                # Generate ID if not present
-                if 'id' not in data:
-                    import uuid
-                    data['id'] = str(uuid.uuid4())
-                
-                # Convert datetime objects to ISO strings
-                for key in ['timestamp', 'closed_at', 'opened_at']:
-                    if key in data and isinstance(data[key], datetime):
-                        data[key] = data[key].isoformat()
-                
-                # Extract fields
-                fields = ['id', 'timestamp', 'commodity', 'type', 'price', 'quantity', 
-                         'status', 'platform', 'entry_price', 'exit_price', 'profit_loss',
-                         'stop_loss', 'take_profit', 'strategy_signal', 'closed_at', 
-                         'mt5_ticket', 'strategy', 'opened_at', 'opened_by', 'closed_by', 
-                         'close_reason']
-                
-                values = [data.get(f) for f in fields]
-                placeholders = ','.join(['?' for _ in fields])
-                
-                await self.db._conn.execute(
-                    f"INSERT INTO trades ({','.join(fields)}) VALUES ({placeholders})",
-                    values
-                )
-                await self.db._conn.commit()
-                return  # Success
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("locked" in error_msg or "busy" in error_msg) and attempt < max_retries - 1:
-                    logger.warning(f"⚠️ DB locked for insert trade (attempt {attempt + 1}/{max_retries}), waiting...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5
-                else:
-                    logger.error(f"Error inserting trade: {e}")
-                    raise
+    async def insert_one(self, data: dict, auto_commit: bool = True):
+        """Insert new trade"""
+        try:
+            # ID generieren, datetime -> ISO, Felder extrahieren
+            values = _prepare_trade_row(data)
+            
+            async with self.db.write(auto_commit):
+                await self.db._conn.execute(_INSERT_TRADE_SQL, values)
+        except Exception as e:
+            logger.error(f"Error inserting trade: {e}")
+            raise
+    
+    async def insert_many(self, rows: List[dict], auto_commit: bool = True) -> int:
+        """Insert many trades with one prepared statement per chunk (executemany)"""
+        values = [_prepare_trade_row(row) for row in rows]
+        return await self.db.executemany_in_chunks(_INSERT_TRADE_SQL, values, auto_commit)
     
-    async def update_one(self, query: dict, update: dict):
-        """Update trade with retry logic for SQLite locking"""
-        import asyncio
+    async def bulk_update(self, ids: List[str], update: dict, auto_commit: bool = True) -> int:
+        """Apply the same $set to many trades by id (executemany in one transaction)"""
+        set_data = update.get('$set', {})
+        if not set_data or not ids:
+            return 0
         
-        max_retries = 5
-        retry_delay = 0.3
+        # Feldnamen landen im SQL-Text - nur echte Spalten zulassen
+        unknown = set(set_data) - TRADE_COLUMNS
+        if unknown:
+            raise ValueError(f"Unbekannte Trade-Felder: {sorted(unknown)}")
         
-        for attempt in range(max_retries):
-            try:
-                # Build WHERE clause
-                where_parts = []
-                where_values = []
-                for key, value in query.items():
-                    where_parts.append(f"{key} = ?")
-                    where_values.append(value)
+        set_values = [value.isoformat() if isinstance(value, datetime) else value
+                      for value in set_data.values()]
+        set_clause = ", ".join(f"{key} = ?" for key in set_data)
+        return await self.db.executemany_in_chunks(
+            f"UPDATE trades SET {set_clause} WHERE id = ?",
+            [set_values + [trade_id] for trade_id in ids],
+            auto_commit
+        )
+    
+    async def update_one(self, query: dict, update: dict, auto_commit: bool = True):
+        """Update trade"""
+        try:
+            # Build WHERE clause
+            where_parts = []
+            where_values = []
+            for key, value in query.items():
+                where_parts.append(f"{key} = ?")
+                where_values.append(value)
+            
+            where_clause = " AND ".join(where_parts)
+            
+            # Build SET clause
+            if '$set' in update:
+                set_data = update['$set']
+                set_parts = []
+                set_values = []
+                for key, value in set_data.items():
+                    set_parts.append(f"{key} = ?")
+                    if isinstance(value, datetime):
+                        value = value.isoformat()
+                    set_values.append(value)
                 
-                where_clause = " AND ".join(where_parts)
+                set_clause = ", ".join(set_parts)
                 
-                # Build SET clause
-                if '$set' in update:
-                    set_data = update['$set']
-                    set_parts = []
-                    set_values = []
-                    for key, value in set_data.items():
-                        set_parts.append(f"{key} = ?")
-                        if isinstance(value, datetime):
-                            value = value.isoformat()
-                        set_values.append(value)
-                    
-                    set_clause = ", ".join(set_parts)
-                    
+                async with self.db.write(auto_commit):
                     await self.db._conn.execute(
                         f"UPDATE trades SET {set_clause} WHERE {where_clause}",
                         set_values + where_values
                     )
-                    await self.db._conn.commit()
-                return  # Success
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("locked" in error_msg or "busy" in error_msg) and attempt < max_retries - 1:
-                    logger.warning(f"⚠️ DB locked for trades (attempt {attempt + 1}/{max_retries}), waiting...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5
-                else:
-                    logger.error(f"Error updating trade: {e}")
-                    raise
+        except Exception as e:
+            logger.error(f"Error updating trade: {e}")
+            raise
     
-    async def delete_one(self, query: dict):
-        """Delete trade with retry logic for SQLite locking"""
-        import asyncio
-        
-        max_retries = 5
-        retry_delay = 0.5
-        
-        for attempt in range(max_retries):
-            try:
-                # Build WHERE clause
-                where_parts = []
-                where_values = []
-                for key, value in query.items():
-                    where_parts.append(f"{key} = ?")
-                    where_values.append(value)
-                
-                where_clause = " AND ".join(where_parts)
-                
-                # Execute delete
+    async def delete_one(self, query: dict, auto_commit: bool = True):
+        """Delete trade"""
+        try:
+            # Build WHERE clause
+            where_parts = []
+            where_values = []
+            for key, value in query.items():
+                where_parts.append(f"{key} = ?")
+                where_values.append(value)
+            
+            where_clause = " AND ".join(where_parts)
+            
+            # Execute delete
+            async with self.db.write(auto_commit):
                 cursor = await self.db._conn.execute(
                     f"DELETE FROM trades WHERE {where_clause}",
                     where_values
                 )
-                await self.db._conn.commit()
-                
-                # Return result object
-                class DeleteResult:
-                    def __init__(self, count):
-                        self.deleted_count = count
-                
-                return DeleteResult(cursor.rowcount)
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("locked" in error_msg or "busy" in error_msg) and attempt < max_retries - 1:
-                    logger.warning(f"Database locked while deleting trade, retry {attempt + 1}/{max_retries}...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger.error(f"Error deleting trade after {attempt + 1} attempts: {e}")
-                    raise
+            
+            # Return result object
+            class DeleteResult:
+                def __init__(self, count):
+                    self.deleted_count = count
+            
+            return DeleteResult(cursor.rowcount)
+        except Exception as e:
+            logger.error(f"Error deleting trade: {e}")
+            raise
     
-    async def delete_many(self, query: dict = None):
-        """V2.3.32: Delete multiple trades matching query with retry logic"""
-        import asyncio
-        
-        max_retries = 5
-        retry_delay = 0.5
-        
+    async def delete_many(self, query: dict = None, auto_commit: bool = True):
+        """V2.3.32: Delete multiple trades matching query"""
         # Return object for compatibility
         class DeleteResult:
             def __init__(self, count):
                 self.deleted_count = count
         
-        for attempt in range(max_retries):
-            try:
-                if not query:
-                    # Delete all trades
-                    cursor = await self.db._conn.execute("DELETE FROM trades")
-                else:
-                    # Build WHERE clause - handle $or and $exists operators
-                    where_parts = []
-                    where_values = []
-                    
-                    if '$or' in query:
-                        # Handle $or operator
-                        or_parts = []
-                        for condition in query['$or']:
-                            for key, value in condition.items():
-                                if isinstance(value, dict) and '$exists' in value:
-                                    if value['$exists'] == False:
-                                        or_parts.append(f"({key} IS NULL OR {key} = '')")
-                                else:
-                                    or_parts.append(f"{key} = ?")
-                                    where_values.append(value)
-                        where_parts.append(f"({' OR '.join(or_parts)})")
-                    else:
-                        for key, value in query.items():
+        try:
+            if not query:
+                # Delete all trades
+                sql = "DELETE FROM trades"
+                where_values = []
+            else:
+                # Build WHERE clause - handle $or and $exists operators
+                where_parts = []
+                where_values = []
+                
+                if '$or' in query:
+                    # Handle $or operator
+                    or_parts = []
+                    for condition in query['$or']:
+                        for key, value in condition.items():
                             if isinstance(value, dict) and '$exists' in value:
                                 if value['$exists'] == False:
-                                    where_parts.append(f"({key} IS NULL OR {key} = '')")
+                                    or_parts.append(f"({key} IS NULL OR {key} = '')")
                             else:
-                                where_parts.append(f"{key} = ?")
+                                or_parts.append(f"{key} = ?")
                                 where_values.append(value)
-                    
-                    where_clause = " AND ".join(where_parts) if where_parts else "1=1"
-                    cursor = await self.db._conn.execute(
-                        f"DELETE FROM trades WHERE {where_clause}",
-                        where_values
-                    )
-                
-                await self.db._conn.commit()
-                return DeleteResult(cursor.rowcount)
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("locked" in error_msg or "busy" in error_msg) and attempt < max_retries - 1:
-                    logger.warning(f"Database locked while deleting trades, retry {attempt + 1}/{max_retries}...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5
+                    where_parts.append(f"({' OR '.join(or_parts)})")
                 else:
-                    logger.error(f"Error deleting trades after {attempt + 1} attempts: {e}")
-                    return DeleteResult(0)  # Return 0 instead of raising
+                    for key, value in query.items():
+                        if isinstance(value, dict) and '$exists' in value:
+                            if value['$exists'] == False:
+                                where_parts.append(f"({key} IS NULL OR {key} = '')")
+                        else:
+                            where_parts.append(f"{key} = ?")
+                            where_values.append(value)
+                
+                where_clause = " AND ".join(where_parts) if where_parts else "1=1"
+                sql = f"DELETE FROM trades WHERE {where_clause}"
+            
+            async with self.db.write(auto_commit):
+                cursor = await self.db._conn.execute(sql, where_values)
+            return DeleteResult(cursor.rowcount)
+        except Exception as e:
+            logger.error(f"Error deleting trades: {e}")
+            return DeleteResult(0)  # Return 0 instead of raising
+    
+    async def count_estimate(self) -> int:
+        """
+        Ungefähre Anzahl Trades aus sqlite_stat1 (Stand des letzten ANALYZE)
         
-        return DeleteResult(0)
-
-    async def count_documents(self, query: dict = None):
-        """Count trades matching query"""
+        Ohne Tabellen-Scan - für Anzeigen, bei denen die exakte Zahl nicht zählt.
+        Ohne Statistik wird exakt gezählt.
+        """
+        try:
+            async with self.db.reader.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = 'trades' LIMIT 1"
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row and row[0]:
+                return int(row[0].split()[0])
+        except Exception as e:
+            logger.debug(f"No sqlite_stat1 estimate for trades: {e}")
+        return await self.count_documents()
+    
+    async def count_documents(self, query: dict = None, exact: bool = True):
+        """Count trades matching query (exact=False: estimate for an empty query)"""
+        if not query and not exact:
+            return await self.count_estimate()
         try:
             if not query:
-                cursor = await self.db._conn.execute("SELECT COUNT(*) FROM trades")
+                cursor = await self.db.reader.execute("SELECT COUNT(*) FROM trades")
             else:
                 where_parts = []
                 where_values = []
@@ -586,7 +985,7 @@ class Trades:
                     where_values.append(value)
                 
                 where_clause = " AND ".join(where_parts)
-                cursor = await self.db._conn.execute(
+                cursor = await self.db.reader.execute(
                     f"SELECT COUNT(*) FROM trades WHERE {where_clause}",
                     where_values
                 )
@@ -597,6 +996,21 @@ class Trades:
             logger.error(f"Error counting trades: {e}")
             return 0
 
+    async def sum_open_exposure(self, platform: str = None) -> float:
+        """Sum entry_price * quantity of open trades (aggregated in SQL)"""
+        try:
+            query = "SELECT COALESCE(SUM(entry_price * quantity), 0) FROM trades WHERE status = 'OPEN'"
+            params = []
+            if platform:
+                query += " AND platform = ?"
+                params.append(platform)
+            cursor = await self.db.reader.execute(query, params)
+            result = await cursor.fetchone()
+            return float(result[0]) if result else 0.0
+        except Exception as e:
+            logger.error(f"Error summing open exposure: {e}")
+            return 0.0
+
 
 class TradesCursor:
     """MongoDB-like cursor for trades"""
@@ -605,13 +1019,14 @@ class TradesCursor:
         self.db = db
         self.query = query
         self.projection = projection
+        self._columns = None
         self._sort_field = None
         self._sort_direction = None
         self._limit_value = None
     
     def sort(self, field: str, direction: int = 1):
         """Sort results"""
-        self._sort_field = field
+        self._sort_field = _checked_sort_field(field, TRADE_COLUMNS)
         self._sort_direction = "ASC" if direction == 1 else "DESC"
         return self
     
@@ -620,48 +1035,50 @@ class TradesCursor:
         self._limit_value = n
         return self
     
+    def _build_sql(self, length: int = None):
+        """SQL und Parameter für die aktuelle Query"""
+        # Build WHERE clause - supports $in operator
+        where_clause, where_values = _build_where('trades', self.query)
+        
+        # Build query - nur die projizierten Spalten
+        self._columns = _projected_columns('trades', self.projection)
+        select_list = ', '.join(self._columns) if self._columns else '*'
+        sql = f"SELECT {select_list} FROM trades WHERE {where_clause}"
+        
+        if self._sort_field:
+            sql += f" ORDER BY {self._sort_field} {self._sort_direction}"
+        
+        # LIMIT gebunden - gleiche Abfrage-Form, gleiches Statement im Cache
+        limit = self._limit_value or length
+        if limit:
+            sql += " LIMIT ?"
+            where_values = [*where_values, int(limit)]
+        return sql, where_values
+    
     async def to_list(self, length: int = None) -> List[dict]:
         """Execute query and return list"""
         try:
-            # Build WHERE clause - supports $in operator
-            where_parts = []
-            where_values = []
-            for key, value in self.query.items():
-                if isinstance(value, dict):
-                    # Handle operators
-                    for op, op_value in value.items():
-                        if op == '$gte':
-                            where_parts.append(f"{key} >= ?")
-                            where_values.append(op_value.isoformat() if isinstance(op_value, datetime) else op_value)
-                        elif op == '$in':
-                            # Support $in operator: key IN (?, ?, ?)
-                            placeholders = ','.join(['?' for _ in op_value])
-                            where_parts.append(f"{key} IN ({placeholders})")
-                            where_values.extend(op_value)
-                else:
-                    where_parts.append(f"{key} = ?")
-                    where_values.append(value)
-            
-            where_clause = " AND ".join(where_parts) if where_parts else "1=1"
-            
-            # Build query
-            sql = f"SELECT * FROM trades WHERE {where_clause}"
-            
-            if self._sort_field:
-                sql += f" ORDER BY {self._sort_field} {self._sort_direction}"
-            
-            if self._limit_value:
-                sql += f" LIMIT {self._limit_value}"
-            elif length:
-                sql += f" LIMIT {length}"
-            
-            async with self.db._conn.execute(sql, where_values) as cursor:
+            sql, where_values = self._build_sql(length)
+            async with self.db.reader.execute(sql, where_values) as cursor:
                 rows = await cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
+                columns = self._columns or _COLUMNS_CACHE.get('trades') or tuple(desc[0] for desc in cursor.description)
                 return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             return []
+    
+    async def to_namedtuple_list(self, length: int = None) -> list:
+        """Wie to_list, aber Zeilen als namedtuple (kleiner als dict, Zugriff per Attribut)"""
+        try:
+            sql, where_values = self._build_sql(length)
+            async with self.db.reader.execute(sql, where_values) as cursor:
+                rows = await cursor.fetchall()
+                columns = self._columns or _COLUMNS_CACHE.get('trades') or tuple(desc[0] for desc in cursor.description)
+                row_type = _row_type('trades', columns)
+                return [row_type._make(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error executing query: {e}")
+            return []
 
 
 class TradeSettings:
@@ -670,9 +1087,9 @@ class TradeSettings:
     def __init__(self, db: Database):
         self.db = db
     
-    async def find(self, query: dict = None) -> 'TradeSettingsCursor':
+    async def find(self, query: dict = None, projection: dict = None) -> 'TradeSettingsCursor':
         """Find trade settings (MongoDB-like API)"""
-        return TradeSettingsCursor(self.db, query or {})
+        return TradeSettingsCursor(self.db, query or {}, projection)
     
     async def find_one(self, query: dict, projection: dict = None) -> Optional[dict]:
         """Find single trade setting"""
@@ -681,20 +1098,22 @@ class TradeSettings:
             if not trade_id:
                 return None
             
-            async with self.db._conn.execute(
-                "SELECT * FROM trade_settings WHERE trade_id = ?",
+            projected = _projected_columns('trade_settings', projection)
+            select_list = ', '.join(projected) if projected else '*'
+            async with self.db.reader.execute(
+                f"SELECT {select_list} FROM trade_settings WHERE trade_id = ?",
                 (trade_id,)
             ) as cursor:
                 row = await cursor.fetchone()
                 if row:
-                    columns = [desc[0] for desc in cursor.description]
+                    columns = projected or _COLUMNS_CACHE.get('trade_settings') or tuple(desc[0] for desc in cursor.description)
                     return dict(zip(columns, row))
                 return None
         except Exception as e:
             logger.error(f"Error fetching trade settings: {e}")
             return None
     
-    async def insert_one(self, data: dict):
+    async def insert_one(self, data: dict, auto_commit: bool = True):
         """Insert trade settings"""
         try:
             fields = ['trade_id', 'stop_loss', 'take_profit', 'strategy', 
@@ -703,88 +1122,57 @@ class TradeSettings:
             values = [data.get(f) for f in fields]
             placeholders = ','.join(['?' for _ in fields])
             
-            await self.db._conn.execute(
-                f"INSERT INTO trade_settings ({','.join(fields)}) VALUES ({placeholders})",
-                values
-            )
-            await self.db._conn.commit()
+            async with self.db.write(auto_commit):
+                await self.db._conn.execute(
+                    f"INSERT INTO trade_settings ({','.join(fields)}) VALUES ({placeholders})",
+                    values
+                )
         except Exception as e:
             logger.error(f"Error inserting trade settings: {e}")
             raise
     
-    async def update_one(self, query: dict, update: dict, upsert: bool = False):
-        """Update trade settings with EXPLICIT field order and retry logic for SQLite locking"""
-        import asyncio
-        
-        max_retries = 5
-        retry_delay = 0.3
-        
-        for attempt in range(max_retries):
-            try:
-                trade_id = query.get('trade_id')
-                existing = await self.find_one(query)
-                
-                if existing:
-                    # Update with EXPLICIT field order
-                    set_data = update.get('$set', {})
-                    
-                    # CRITICAL FIX: Define fields in EXPLICIT order to prevent confusion
-                    # Always process in this order: stop_loss FIRST, then take_profit
-                    field_order = ['stop_loss', 'take_profit', 'strategy', 'entry_price', 
-                                  'created_at', 'platform', 'commodity', 'created_by', 'status', 'type']
-                    
-                    set_parts = []
-                    set_values = []
-                    
-                    for field in field_order:
-                        if field in set_data:
-                            set_parts.append(f"{field} = ?")
-                            set_values.append(set_data[field])
-                            logger.debug(f"  UPDATE {field} = {set_data[field]}")
-                    
-                    if set_parts:
-                        set_clause = ", ".join(set_parts)
-                        set_values.append(trade_id)
-                        
-                        logger.debug(f"UPDATE SQL: UPDATE trade_settings SET {set_clause} WHERE trade_id = {trade_id}")
-                        
-                        await self.db._conn.execute(
-                            f"UPDATE trade_settings SET {set_clause} WHERE trade_id = ?",
-                            set_values
-                        )
-                elif upsert:
-                    # Insert with explicit field order
-                    new_data = update.get('$set', {})
-                    new_data['trade_id'] = trade_id
-                    await self.insert_one(new_data)
-                
-                await self.db._conn.commit()
-                return  # Success, exit retry loop
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("locked" in error_msg or "busy" in error_msg) and attempt < max_retries - 1:
-                    logger.warning(f"⚠️ DB locked for trade_settings (attempt {attempt + 1}/{max_retries}), waiting...")
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5  # Exponential backoff
-                else:
-                    logger.error(f"Error updating trade settings after {attempt + 1} attempts: {e}")
-                    raise
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, auto_commit: bool = True):
+        """Update trade settings with EXPLICIT field order (ein Statement, Upsert per ON CONFLICT)"""
+        try:
+            trade_id = query.get('trade_id')
+            set_data = update.get('$set', {})
+            
+            fields = tuple(field for field in _TRADE_SETTINGS_UPDATE_ORDER if field in set_data)
+            values = [set_data[field] for field in fields]
+            
+            if upsert:
+                # INSERT mit allen Spalten (fehlende als NULL, wie insert_one) - sonst
+                # bekäme status den DEFAULT 'OPEN' und zählte als offene KI-Position
+                sql = _upsert_sql('trade_settings', 'trade_id', fields, _TRADE_SETTINGS_UPDATE_ORDER)
+                params = [trade_id, *(set_data.get(field) for field in _TRADE_SETTINGS_UPDATE_ORDER)]
+            elif fields:
+                sql = _update_sql('trade_settings', 'trade_id', fields)
+                params = [*values, trade_id]
+            else:
+                return
+            
+            logger.debug(f"{sql} <- {trade_id}")
+            async with self.db.write(auto_commit):
+                await self.db._conn.execute(sql, params)
+        except Exception as e:
+            logger.error(f"Error updating trade settings: {e}")
+            raise
 
 
 class TradeSettingsCursor:
     """MongoDB-like cursor for trade settings"""
     
-    def __init__(self, db: Database, query: dict):
+    def __init__(self, db: Database, query: dict, projection: dict = None):
         self.db = db
         self.query = query
+        self.projection = projection
         self._sort_field = None
         self._sort_direction = "ASC"
         self._limit_value = None
     
     def sort(self, field: str, direction: int = 1):
         """Sort results"""
-        self._sort_field = field
+        self._sort_field = _checked_sort_field(field, TRADE_SETTINGS_COLUMNS)
         self._sort_direction = "ASC" if direction == 1 else "DESC"
         return self
     
@@ -797,40 +1185,24 @@ class TradeSettingsCursor:
         """Execute query and return list - supports $in operator"""
         try:
             # Build WHERE clause
-            where_parts = []
-            where_values = []
-            for key, value in self.query.items():
-                if isinstance(value, dict):
-                    # Handle operators
-                    for op, op_value in value.items():
-                        if op == '$gte':
-                            where_parts.append(f"{key} >= ?")
-                            where_values.append(op_value.isoformat() if isinstance(op_value, datetime) else op_value)
-                        elif op == '$in':
-                            # Support $in operator: key IN (?, ?, ?)
-                            placeholders = ','.join(['?' for _ in op_value])
-                            where_parts.append(f"{key} IN ({placeholders})")
-                            where_values.extend(op_value)
-                else:
-                    where_parts.append(f"{key} = ?")
-                    where_values.append(value)
+            where_clause, where_values = _build_where('trade_settings', self.query)
             
-            where_clause = " AND ".join(where_parts) if where_parts else "1=1"
-            
-            # Build query
-            sql = f"SELECT * FROM trade_settings WHERE {where_clause}"
+            # Build query - nur die projizierten Spalten
+            projected = _projected_columns('trade_settings', self.projection)
+            select_list = ', '.join(projected) if projected else '*'
+            sql = f"SELECT {select_list} FROM trade_settings WHERE {where_clause}"
             
             if self._sort_field:
                 sql += f" ORDER BY {self._sort_field} {self._sort_direction}"
             
-            if self._limit_value:
-                sql += f" LIMIT {self._limit_value}"
-            elif length:
-                sql += f" LIMIT {length}"
+            limit = self._limit_value or length
+            if limit:
+                sql += " LIMIT ?"
+                where_values = [*where_values, int(limit)]
             
-            async with self.db._conn.execute(sql, where_values) as cursor:
+            async with self.db.reader.execute(sql, where_values) as cursor:
                 rows = await cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
+                columns = projected or _COLUMNS_CACHE.get('trade_settings') or tuple(desc[0] for desc in cursor.description)
                 return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             logger.error(f"Error executing trade settings query: {e}")
@@ -852,63 +1224,53 @@ class MarketData:
             
             sql = "SELECT * FROM market_data WHERE commodity = ?"
             
-            async with self.db._conn.execute(sql, (commodity,)) as cursor:
+            async with self.db.reader.execute(sql, (commodity,)) as cursor:
                 row = await cursor.fetchone()
                 if row:
-                    columns = [desc[0] for desc in cursor.description]
+                    columns = _COLUMNS_CACHE.get('market_data') or tuple(desc[0] for desc in cursor.description)
                     return dict(zip(columns, row))
                 return None
         except Exception as e:
             logger.error(f"Error fetching market data: {e}")
             return None
     
-    async def find(self, query: dict = None) -> 'MarketDataCursor':
+    async def find(self, query: dict = None, projection: dict = None) -> 'MarketDataCursor':
         """Find multiple market data"""
-        return MarketDataCursor(self.db, query or {})
+        return MarketDataCursor(self.db, query or {}, projection)
     
-    async def update_one(self, query: dict, update: dict, upsert: bool = False):
-        """Update market data"""
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, auto_commit: bool = True):
+        """Update market data (ein Statement, Upsert per ON CONFLICT(commodity))"""
         try:
             commodity = query.get('commodity')
             set_data = update.get('$set', {})
             
-            existing = await self.find_one(query)
-            
-            if existing:
-                # Update
-                set_parts = []
-                set_values = []
-                for key, value in set_data.items():
-                    set_parts.append(f"{key} = ?")
-                    if isinstance(value, datetime):
-                        value = value.isoformat()
-                    set_values.append(value)
-                
-                set_clause = ", ".join(set_parts)
-                set_values.append(commodity)
-                
-                await self.db._conn.execute(
-                    f"UPDATE market_data SET {set_clause} WHERE commodity = ?",
-                    set_values
-                )
-            elif upsert:
-                # Insert
-                fields = ['commodity', 'timestamp', 'price', 'volume', 'sma_20', 'ema_20',
-                         'rsi', 'macd', 'macd_signal', 'macd_histogram', 'trend', 'signal']
-                values = [set_data.get(f) for f in fields]
-                
-                # Convert datetime
-                if isinstance(values[1], datetime):
-                    values[1] = values[1].isoformat()
-                
-                placeholders = ','.join(['?' for _ in fields])
-                
-                await self.db._conn.execute(
-                    f"INSERT INTO market_data ({','.join(fields)}) VALUES ({placeholders})",
-                    values
-                )
+            fields = tuple(field for field in _MARKET_DATA_FIELDS[1:] if field in set_data)
+            values = []
+            for field in fields:
+                value = set_data[field]
+                if isinstance(value, datetime):
+                    value = value.isoformat()
+                values.append(value)
             
-            await self.db._conn.commit()
+            async with self.db.write(auto_commit):
+                if upsert and _MARKET_DATA_REQUIRED.issubset(fields):
+                    # Vollständiger Tick: ein Statement
+                    await self.db._conn.execute(
+                        _upsert_sql('market_data', 'commodity', fields), [commodity, *values]
+                    )
+                else:
+                    # SQLite prüft NOT NULL (timestamp, price) vor ON CONFLICT - ein
+                    # Teil-Update auf eine bestehende Zeile muss ein UPDATE sein
+                    rowcount = 0
+                    if fields:
+                        cursor = await self.db._conn.execute(
+                            _update_sql('market_data', 'commodity', fields), [*values, commodity]
+                        )
+                        rowcount = cursor.rowcount
+                    if upsert and rowcount == 0:
+                        await self.db._conn.execute(
+                            _upsert_sql('market_data', 'commodity', fields), [commodity, *values]
+                        )
         except Exception as e:
             logger.error(f"Error updating market data: {e}")
             raise
@@ -917,20 +1279,25 @@ class MarketData:
 class MarketDataCursor:
     """Cursor for market data"""
     
-    def __init__(self, db: Database, query: dict):
+    def __init__(self, db: Database, query: dict, projection: dict = None):
         self.db = db
         self.query = query
+        self.projection = projection
     
     async def to_list(self, length: int = None) -> List[dict]:
         """Execute and return list"""
         try:
-            sql = "SELECT * FROM market_data"
+            projected = _projected_columns('market_data', self.projection)
+            select_list = ', '.join(projected) if projected else '*'
+            sql = f"SELECT {select_list} FROM market_data"
+            params = ()
             if length:
-                sql += f" LIMIT {length}"
+                sql += " LIMIT ?"
+                params = (int(length),)
             
-            async with self.db._conn.execute(sql) as cursor:
+            async with self.db.reader.execute(sql, params) as cursor:
                 rows = await cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
+                columns = projected or _COLUMNS_CACHE.get('market_data') or tuple(desc[0] for desc in cursor.description)
                 return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             logger.error(f"Error executing market data query: {e}")
@@ -943,17 +1310,12 @@ class Stats:
     def __init__(self, db: Database):
         self.db = db
     
-    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, auto_commit: bool = True):
         """Update or insert stats"""
-        import asyncio
-        
-        max_retries = 5
-        retry_delay = 0.5
-        
-        for attempt in range(max_retries):
-            try:
-                set_data = update.get('$set', {})
-                
+        try:
+            set_data = update.get('$set', {})
+            
+            async with self.db.write(auto_commit):
                 # Check if stats exist
                 async with self.db._conn.execute("SELECT COUNT(*) FROM stats") as cursor:
                     result = await cursor.fetchone()
@@ -979,18 +1341,9 @@ class Stats:
                         f"INSERT INTO stats ({','.join(fields)}) VALUES ({placeholders})",
                         values
                     )
-                
-                await self.db._conn.commit()
-                break
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("locked" in error_msg or "busy" in error_msg) and attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 1.5
-                else:
-                    logger.error(f"Error updating stats: {e}")
-                    raise
+        except Exception as e:
+            logger.error(f"Error updating stats: {e}")
+            raise
 
 
 class MarketDataHistory:
@@ -999,24 +1352,20 @@ class MarketDataHistory:
     def __init__(self, db: Database):
         self.db = db
     
-    async def insert_one(self, data: dict):
+    async def insert_one(self, data: dict, auto_commit: bool = True):
         """Insert history entry"""
         try:
-            fields = ['commodity_id', 'timestamp', 'price', 'volume', 'sma_20', 'ema_20',
-                     'rsi', 'macd', 'macd_signal', 'macd_histogram', 'trend', 'signal']
-            values = [data.get(f) for f in fields]
-            
-            # Convert datetime
-            if isinstance(values[1], datetime):
-                values[1] = values[1].isoformat()
-            
-            placeholders = ','.join(['?' for _ in fields])
-            
-            await self.db._conn.execute(
-                f"INSERT INTO market_data_history ({','.join(fields)}) VALUES ({placeholders})",
-                values
-            )
-            await self.db._conn.commit()
+            async with self.db.write(auto_commit):
+                await self.db._conn.execute(_INSERT_HISTORY_SQL, _prepare_history_row(data))
+        except Exception as e:
+            logger.error(f"Error inserting market data history: {e}")
+            raise
+    
+    async def insert_many(self, rows: List[dict], auto_commit: bool = True) -> int:
+        """Insert many history entries (executemany, one commit per chunk)"""
+        try:
+            values = [_prepare_history_row(row) for row in rows]
+            return await self.db.executemany_in_chunks(_INSERT_HISTORY_SQL, values, auto_commit)
         except Exception as e:
             logger.error(f"Error inserting market data history: {e}")
             raise
@@ -1037,7 +1386,7 @@ class MarketDataHistoryCursor:
     
     def sort(self, field: str, direction: int = 1):
         """Sort results"""
-        self._sort_field = field
+        self._sort_field = _checked_sort_field(field, HISTORY_COLUMNS)
         self._sort_direction = "ASC" if direction == 1 else "DESC"
         return self
     
@@ -1045,22 +1394,7 @@ class MarketDataHistoryCursor:
         """Execute and return list"""
         try:
             # Build WHERE
-            where_parts = []
-            where_values = []
-            
-            for key, value in self.query.items():
-                if isinstance(value, dict):
-                    for op, op_value in value.items():
-                        if op == '$gte':
-                            where_parts.append(f"{key} >= ?")
-                            if isinstance(op_value, datetime):
-                                op_value = op_value.isoformat()
-                            where_values.append(op_value)
-                else:
-                    where_parts.append(f"{key} = ?")
-                    where_values.append(value)
-            
-            where_clause = " AND ".join(where_parts) if where_parts else "1=1"
+            where_clause, where_values = _build_where('market_data_history', self.query, ('$gte',))
             
             sql = f"SELECT * FROM market_data_history WHERE {where_clause}"
             
@@ -1068,11 +1402,12 @@ class MarketDataHistoryCursor:
                 sql += f" ORDER BY {self._sort_field} {self._sort_direction}"
             
             if length:
-                sql += f" LIMIT {length}"
+                sql += " LIMIT ?"
+                where_values = [*where_values, int(length)]
             
-            async with self.db._conn.execute(sql, where_values) as cursor:
+            async with self.db.reader.execute(sql, where_values) as cursor:
                 rows = await cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
+                columns = _COLUMNS_CACHE.get('market_data_history') or tuple(desc[0] for desc in cursor.description)
                 return [dict(zip(columns, row)) for row in rows]
         except Exception as e:
             logger.error(f"Error executing history query: {e}")
@@ -1107,6 +1442,7 @@ try:
     class DummyMarketHistory:
         async def find(self, query=None): return DummyMarketHistoryCursor()
         async def insert_one(self, data): pass  # V2.3.31: Added insert_one
+        async def insert_many(self, rows): return 0
         async def delete_many(self, query=None): pass
     class DummyMarketHistoryCursor:
         def sort(self, *args): return self
@@ -17,8 +17,81 @@ from pathlib import Path
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# JSON-Funktionen (json_set) sind ab SQLite 3.38 fest eingebaut
+_JSON_SET_SUPPORTED = sqlite3.sqlite_version_info >= (3, 38, 0)
+# (Pfad, Wert)-Paare pro json_set-Aufruf (SQLITE_MAX_FUNCTION_ARG = 127)
+_JSON_SET_MAX_PAIRS = 63
+
+# Verbindungs-Tuning
+_MMAP_SIZE = 256 * 1024 * 1024
+_OPTIMIZE_INTERVAL = 15 * 60  # Sekunden
+
+# Settings-JSON größer als das wird im Thread geparst statt im Event-Loop
+_JSON_OFFLOAD_SIZE = 64 * 1024
+
+
+_TRADE_FIELDS = ('id', 'timestamp', 'commodity', 'type', 'price', 'quantity',
+                 'status', 'platform', 'entry_price', 'exit_price', 'profit_loss',
+                 'stop_loss', 'take_profit', 'strategy_signal', 'closed_at',
+                 'mt5_ticket', 'strategy', 'opened_at', 'opened_by', 'closed_by', 'close_reason')
+_INSERT_TRADE_SQL = (f"INSERT INTO trades ({','.join(_TRADE_FIELDS)}) "
+                     f"VALUES ({','.join('?' for _ in _TRADE_FIELDS)})")
+
+# Bulk-Inserts: Zeilen pro Transaktion
+_BULK_CHUNK_SIZE = 10000
+
+_MARKET_DATA_FIELDS = ('commodity', 'timestamp', 'price', 'volume', 'sma_20', 'ema_20',
+                       'rsi', 'macd', 'macd_signal', 'macd_histogram', 'trend', 'signal', 'data_source')
+_MARKET_DATA_UPSERT_SQL = (
+    f"INSERT INTO market_data ({','.join(_MARKET_DATA_FIELDS)}) "
+    f"VALUES ({','.join('?' for _ in _MARKET_DATA_FIELDS)}) "
+    f"ON CONFLICT(commodity) DO UPDATE SET "
+    f"{','.join(f'{f}=excluded.{f}' for f in _MARKET_DATA_FIELDS if f != 'commodity')}"
+)
+
+_TRADE_SETTINGS_FIELDS = ('trade_id', 'stop_loss', 'take_profit', 'strategy', 'entry_price',
+                          'created_at', 'platform', 'commodity', 'created_by', 'status', 'type')
+# UPSERT-Statements je Menge übergebener Felder - nur diese werden bei Konflikt überschrieben
+_TRADE_SETTINGS_UPSERT_SQL = {}
+
+
+def _trade_settings_upsert_sql(update_fields: tuple) -> str:
+    sql = _TRADE_SETTINGS_UPSERT_SQL.get(update_fields)
+    if sql is None:
+        conflict = (f"DO UPDATE SET {', '.join(f'{f} = excluded.{f}' for f in update_fields)}"
+                    if update_fields else "DO NOTHING")
+        sql = (f"INSERT INTO trade_settings ({','.join(_TRADE_SETTINGS_FIELDS)}) "
+               f"VALUES ({','.join('?' for _ in _TRADE_SETTINGS_FIELDS)}) "
+               f"ON CONFLICT(trade_id) {conflict}")
+        _TRADE_SETTINGS_UPSERT_SQL[update_fields] = sql
+    return sql
+
+
+def _json_dumps(value) -> str:
+    """JSON-Text für SQLite (orjson liefert bytes - als BLOB würde json_set scheitern)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value)
+
+
+def _json_loads(text):
+    return orjson.loads(text) if ORJSON_AVAILABLE else json.loads(text)
+
+
+async def _json_loads_async(text):
+    """Große Dokumente im Thread parsen, damit der Event-Loop nicht blockiert"""
+    if len(text) > _JSON_OFFLOAD_SIZE:
+        return await asyncio.to_thread(_json_loads, text)
+    return _json_loads(text)
+
 # ============================================================================
 # DATABASE PATH MANAGEMENT
 # ============================================================================
@@ -70,6 +143,7 @@ class BaseDatabase:
         self.db_path = str(get_db_dir() / db_name)
         self._conn = None
         self._lock = asyncio.Lock()
+        self._optimize_task = None
         logger.info(f"🗄️  {db_name} initialized: {self.db_path}")
     
     async def connect(self):
@@ -87,16 +161,38 @@ class BaseDatabase:
             await self._conn.execute("PRAGMA synchronous=NORMAL")
             await self._conn.execute("PRAGMA cache_size=-32000")  # 32MB Cache
             await self._conn.execute("PRAGMA temp_store=MEMORY")
+            # Seiten per mmap lesen statt pread-Syscalls
+            await self._conn.execute(f"PRAGMA mmap_size={_MMAP_SIZE}")
+            await self._conn.execute("PRAGMA wal_autocheckpoint=1000")
             await self._conn.commit()
+            self._optimize_task = asyncio.create_task(self._optimize_loop())
             logger.info(f"✅ {self.db_name} connected (WAL mode)")
             return self._conn
         except Exception as e:
             logger.error(f"❌ {self.db_name} connection failed: {e}")
             raise
     
+    async def _optimize_loop(self):
+        """PRAGMA optimize alle _OPTIMIZE_INTERVAL Sekunden"""
+        while True:
+            await asyncio.sleep(_OPTIMIZE_INTERVAL)
+            try:
+                async with self._lock:
+                    await self._conn.execute("PRAGMA optimize")
+            except Exception as e:
+                logger.warning(f"⚠️ {self.db_name} PRAGMA optimize failed: {e}")
+    
     async def close(self):
         """Verbindung schließen"""
+        if self._optimize_task:
+            self._optimize_task.cancel()
+            self._optimize_task = None
         if self._conn:
+            try:
+                async with self._lock:
+                    await self._conn.execute("PRAGMA optimize")
+            except Exception as e:
+                logger.warning(f"⚠️ {self.db_name} PRAGMA optimize failed: {e}")
             await self._conn.close()
             self._conn = None
             logger.info(f"🔒 {self.db_name} closed")
@@ -168,7 +264,7 @@ class SettingsDatabase(BaseDatabase):
             ) as cursor:
                 row = await cursor.fetchone()
                 if row:
-                    return json.loads(row[0])
+                    return await _json_loads_async(row[0])
                 return None
         except Exception as e:
             logger.error(f"Error loading settings: {e}")
@@ -179,7 +275,7 @@ class SettingsDatabase(BaseDatabase):
         for attempt in range(5):
             try:
                 async with self._lock:
-                    data_json = json.dumps(data)
+                    data_json = _json_dumps(data)
                     now = datetime.now(timezone.utc).isoformat()
                     
                     # Upsert
@@ -201,6 +297,49 @@ class SettingsDatabase(BaseDatabase):
         return False
 
 
+    async def update_settings(self, set_data: dict, setting_id: str = "trading_settings", upsert: bool = False):
+        """
+        Einzelne Schlüssel der Settings setzen - ein Statement (json_set bzw. UPSERT)
+        statt Laden, Merge in Python und Speichern
+        
+        json_set ersetzt Schlüssel auf oberster Ebene wie dict.update() (json_patch
+        würde None-Werte löschen und verschachtelte Dicts mergen). Max. 127
+        Funktionsargumente - ab 63 Schlüsseln wird json_set verschachtelt.
+        """
+        data_expr = "data"
+        for start in range(0, len(set_data), _JSON_SET_MAX_PAIRS):
+            count = min(_JSON_SET_MAX_PAIRS, len(set_data) - start)
+            data_expr = f"json_set({data_expr}, {', '.join('?, json(?)' for _ in range(count))})"
+        path_values = []
+        for key, value in set_data.items():
+            path_values.extend((f'$."{key}"', _json_dumps(value)))
+        
+        for attempt in range(5):
+            try:
+                async with self._lock:
+                    now = datetime.now(timezone.utc).isoformat()
+                    if upsert:
+                        await self._conn.execute(
+                            f"INSERT INTO trading_settings (id, data, updated_at) VALUES (?, ?, ?) "
+                            f"ON CONFLICT(id) DO UPDATE SET data = {data_expr}, updated_at = excluded.updated_at",
+                            [setting_id, _json_dumps({**set_data, 'id': setting_id}), now] + path_values
+                        )
+                    else:
+                        await self._conn.execute(
+                            f"UPDATE trading_settings SET data = {data_expr}, updated_at = ? WHERE id = ?",
+                            path_values + [now, setting_id]
+                        )
+                    await self._conn.commit()
+                    return True
+            except Exception as e:
+                if "locked" in str(e).lower() and attempt < 4:
+                    await asyncio.sleep(0.3 * (attempt + 1))
+                else:
+                    logger.error(f"Error updating settings: {e}")
+                    raise
+        return False
+
+
 # ============================================================================
 # TRADES DATABASE (trades.db)
 # ============================================================================
@@ -278,9 +417,15 @@ class TradesDatabase(BaseDatabase):
         """)
         
         # Indices für Performance
-        await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status)")
+        # get_trades: WHERE status = ? ORDER BY timestamp DESC ohne separaten Sortierschritt
+        # (ersetzt idx_trades_status - Präfix dieses und des Exposure-Index)
+        await self._conn.execute("DROP INDEX IF EXISTS idx_trades_status")
+        await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_status_ts ON trades(status, timestamp DESC)")
         await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_platform ON trades(platform)")
         await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_commodity ON trades(commodity)")
+        # Covering Index: sum_open_exposure liest nur den Index, keine Tabellenzeilen
+        await self._conn.execute("DROP INDEX IF EXISTS idx_trades_status_platform")
+        await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_open_exposure ON trades(status, platform, entry_price, quantity)")
         
         # V2.3.31: Ticket-Strategy Mapping Tabelle
         # Speichert permanent die Zuordnung von MT5-Ticket zu Strategie
@@ -298,8 +443,9 @@ class TradesDatabase(BaseDatabase):
         await self._conn.commit()
         logger.info("✅ Trades schema initialized (incl. ticket_strategy_map)")
     
-    async def insert_trade(self, data: dict):
-        """Neuen Trade einfügen mit Retry"""
+    @staticmethod
+    def _trade_values(data: dict) -> list:
+        """id vergeben, DateTimes zu ISO-Strings, Werte in _TRADE_FIELDS-Reihenfolge"""
         import uuid
         
         if 'id' not in data:
@@ -310,21 +456,16 @@ class TradesDatabase(BaseDatabase):
             if key in data and isinstance(data[key], datetime):
                 data[key] = data[key].isoformat()
         
-        fields = ['id', 'timestamp', 'commodity', 'type', 'price', 'quantity',
-                  'status', 'platform', 'entry_price', 'exit_price', 'profit_loss',
-                  'stop_loss', 'take_profit', 'strategy_signal', 'closed_at',
-                  'mt5_ticket', 'strategy', 'opened_at', 'opened_by', 'closed_by', 'close_reason']
-        
-        values = [data.get(f) for f in fields]
-        placeholders = ','.join(['?' for _ in fields])
+        return [data.get(f) for f in _TRADE_FIELDS]
+    
+    async def insert_trade(self, data: dict):
+        """Neuen Trade einfügen mit Retry"""
+        values = self._trade_values(data)
         
         for attempt in range(5):
             try:
                 async with self._lock:
-                    await self._conn.execute(
-                        f"INSERT INTO trades ({','.join(fields)}) VALUES ({placeholders})",
-                        values
-                    )
+                    await self._conn.execute(_INSERT_TRADE_SQL, values)
                     await self._conn.commit()
                     return data['id']
             except Exception as e:
@@ -334,6 +475,33 @@ class TradesDatabase(BaseDatabase):
                     logger.error(f"Error inserting trade: {e}")
                     raise
     
+    async def insert_trades(self, rows: List[dict], ignore_existing: bool = False) -> int:
+        """Viele Trades einfügen - ein executemany und ein Commit pro Chunk statt pro Zeile"""
+        sql = _INSERT_TRADE_SQL.replace("INSERT", "INSERT OR IGNORE", 1) if ignore_existing else _INSERT_TRADE_SQL
+        values = [self._trade_values(row) for row in rows]
+        
+        for start in range(0, len(values), _BULK_CHUNK_SIZE):
+            chunk = values[start:start + _BULK_CHUNK_SIZE]
+            for attempt in range(5):
+                try:
+                    async with self._lock:
+                        # Autocommit-Verbindung: ohne BEGIN würde jede Zeile einzeln committet
+                        await self._conn.execute("BEGIN IMMEDIATE")
+                        try:
+                            await self._conn.executemany(sql, chunk)
+                            await self._conn.commit()
+                        except Exception:
+                            await self._conn.rollback()
+                            raise
+                    break
+                except Exception as e:
+                    if "locked" in str(e).lower() and attempt < 4:
+                        await asyncio.sleep(0.2 * (attempt + 1))
+                    else:
+                        logger.error(f"Error inserting trades: {e}")
+                        raise
+        return len(values)
+    
     async def update_trade(self, trade_id: str, updates: dict):
         """Trade aktualisieren"""
         set_parts = []
@@ -380,7 +548,8 @@ class TradesDatabase(BaseDatabase):
             if conditions:
                 query += " WHERE " + " AND ".join(conditions)
             
-            query += f" ORDER BY timestamp DESC LIMIT {limit}"
+            query += " ORDER BY timestamp DESC LIMIT ?"
+            params.append(limit)
             
             async with self._conn.execute(query, params) as cursor:
                 columns = [desc[0] for desc in cursor.description]
@@ -443,6 +612,23 @@ class TradesDatabase(BaseDatabase):
             logger.error(f"Error counting trades: {e}")
             return 0
     
+    async def sum_open_exposure(self, platform: str = None) -> float:
+        """Summe entry_price * quantity aller offenen Trades (in SQL aggregiert)"""
+        try:
+            query = "SELECT COALESCE(SUM(entry_price * quantity), 0) FROM trades WHERE status = 'OPEN'"
+            params = []
+            
+            if platform:
+                query += " AND platform = ?"
+                params.append(platform)
+            
+            async with self._conn.execute(query, params) as cursor:
+                row = await cursor.fetchone()
+                return float(row[0]) if row else 0.0
+        except Exception as e:
+            logger.error(f"Error summing open exposure: {e}")
+            return 0.0
+    
     # V2.3.32: Hilfsfunktion für Strategie-Lookup
     async def find_trade_by_commodity_and_type(self, commodity: str, trade_type: str) -> Optional[dict]:
         """Findet einen Trade nach Commodity und Type"""
@@ -535,39 +721,16 @@ class TradesDatabase(BaseDatabase):
         """Trade Settings speichern/aktualisieren"""
         settings['trade_id'] = trade_id
         
-        fields = ['trade_id', 'stop_loss', 'take_profit', 'strategy', 'entry_price',
-                  'created_at', 'platform', 'commodity', 'created_by', 'status', 'type']
+        # Ein UPSERT statt SELECT + UPDATE/INSERT: neue Zeile mit allen Spalten
+        # (fehlende = NULL), bestehende Zeile nur in den übergebenen Feldern geändert
+        update_fields = tuple(f for f in _TRADE_SETTINGS_FIELDS if f in settings and f != 'trade_id')
+        sql = _trade_settings_upsert_sql(update_fields)
+        values = [settings.get(f) for f in _TRADE_SETTINGS_FIELDS]
         
         for attempt in range(5):
             try:
                 async with self._lock:
-                    # Check if exists
-                    existing = await self.get_trade_settings(trade_id)
-                    
-                    if existing:
-                        # Update
-                        set_parts = []
-                        values = []
-                        for f in fields:
-                            if f in settings and f != 'trade_id':
-                                set_parts.append(f"{f} = ?")
-                                values.append(settings[f])
-                        values.append(trade_id)
-                        
-                        if set_parts:
-                            await self._conn.execute(
-                                f"UPDATE trade_settings SET {', '.join(set_parts)} WHERE trade_id = ?",
-                                values
-                            )
-                    else:
-                        # Insert
-                        values = [settings.get(f) for f in fields]
-                        placeholders = ','.join(['?' for _ in fields])
-                        await self._conn.execute(
-                            f"INSERT INTO trade_settings ({','.join(fields)}) VALUES ({placeholders})",
-                            values
-                        )
-                    
+                    await self._conn.execute(sql, values)
                     await self._conn.commit()
                     return True
             except Exception as e:
@@ -609,10 +772,11 @@ class MarketDataDatabase(BaseDatabase):
             )
         """)
         
-        # Historische Daten
+        # Historische Daten (append-only: rowid-PK ohne AUTOINCREMENT,
+        # spart den sqlite_sequence-Write pro Insert)
         await self._conn.execute("""
             CREATE TABLE IF NOT EXISTS market_data_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,
                 commodity TEXT NOT NULL,
                 timestamp TEXT NOT NULL,
                 price REAL NOT NULL,
@@ -624,7 +788,9 @@ class MarketDataDatabase(BaseDatabase):
         
         # Indices
         await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_market_commodity ON market_data(commodity)")
-        await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_commodity ON market_data_history(commodity)")
+        # get_price_history (WHERE commodity = ? ORDER BY timestamp DESC) nutzt den Index
+        # von UNIQUE(commodity, timestamp) rückwärts - ein eigener commodity-Index ist überflüssig
+        await self._conn.execute("DROP INDEX IF EXISTS idx_history_commodity")
         await self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON market_data_history(timestamp)")
         
         await self._conn.commit()
@@ -636,21 +802,12 @@ class MarketDataDatabase(BaseDatabase):
         if 'timestamp' not in data:
             data['timestamp'] = datetime.now(timezone.utc).isoformat()
         
-        fields = ['commodity', 'timestamp', 'price', 'volume', 'sma_20', 'ema_20',
-                  'rsi', 'macd', 'macd_signal', 'macd_histogram', 'trend', 'signal', 'data_source']
+        values = [data.get(f) for f in _MARKET_DATA_FIELDS]
         
         for attempt in range(3):  # Weniger Retries für häufige Updates
             try:
                 async with self._lock:
-                    values = [data.get(f) for f in fields]
-                    placeholders = ','.join(['?' for _ in fields])
-                    update_parts = ','.join([f"{f}=excluded.{f}" for f in fields if f != 'commodity'])
-                    
-                    await self._conn.execute(f"""
-                        INSERT INTO market_data ({','.join(fields)}) VALUES ({placeholders})
-                        ON CONFLICT(commodity) DO UPDATE SET {update_parts}
-                    """, values)
-                    
+                    await self._conn.execute(_MARKET_DATA_UPSERT_SQL, values)
                     await self._conn.commit()
                     return True
             except Exception as e:
@@ -784,12 +941,10 @@ class DatabaseManager:
                     async with old_conn.execute("SELECT * FROM trades") as cursor:
                         columns = [desc[0] for desc in cursor.description]
                         rows = await cursor.fetchall()
-                        for row in rows:
-                            data = dict(zip(columns, row))
-                            try:
-                                await self.trades_db.insert_trade(data)
-                            except:
-                                pass  # Already exists
+                        # Bereits vorhandene Trades werden übersprungen
+                        await self.trades_db.insert_trades(
+                            [dict(zip(columns, row)) for row in rows], ignore_existing=True
+                        )
                         logger.info(f"  ✅ Migrated {len(rows)} trades")
                 except Exception as e:
                     logger.warning(f"  ⚠️ Trades migration: {e}")
@@ -870,6 +1025,12 @@ class TradingSettingsWrapper:
     
     async def update_one(self, query: dict, update: dict, upsert: bool = False):
         setting_id = query.get('id', 'trading_settings')
+        set_data = update.get('$set', {})
+        # json_set-Pfade: Schlüssel mit " (oder SQLite < 3.38) über Laden + Merge
+        if _JSON_SET_SUPPORTED and all(isinstance(key, str) and '"' not in key for key in set_data):
+            await self.db.update_settings(set_data, setting_id, upsert)
+            return
+        
         existing = await self.db.get_settings(setting_id)
         
         if existing:
@@ -905,6 +1066,9 @@ class TradesWrapper:
     async def insert_one(self, data: dict):
         return await self.db.insert_trade(data)
     
+    async def insert_many(self, rows: List[dict]) -> int:
+        return await self.db.insert_trades(rows)
+    
     async def update_one(self, query: dict, update: dict):
         if 'id' in query:
             if '$set' in update:
@@ -924,6 +1088,9 @@ class TradesWrapper:
             strategy=query.get('strategy'),
             commodity=query.get('commodity')
         )
+    
+    async def sum_open_exposure(self, platform: str = None) -> float:
+        return await self.db.sum_open_exposure(platform)
 
 
 class TradesCursorWrapper:
@@ -0,0 +1,349 @@
+"""
+Indikator-Kernels (SMA, EMA, RSI, MACD) als Schleifen über float64-Arrays
+
+Mit Numba werden die Kernels per @njit kompiliert; ohne Numba bleiben es
+reine Python-Funktionen - calculate_indicators nutzt dann all_indicators_np
+(scipy, SCIPY_AVAILABLE) bzw. die pandas-basierte ta-Library.
+
+Die Ergebnisse entsprechen ta (fillna=False): gleiche min_periods und
+gleiche NaN-Behandlung wie pandas rolling/ewm(adjust=False).
+"""
+import math
+import numpy as np
+
+try:
+    from scipy.signal import lfilter
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback ohne Numba: Funktion unverändert zurückgeben"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Schwellen der Handelsregeln (signal_rules);
+# Numba übernimmt Modul-Konstanten beim Kompilieren als Literale
+TREND_UP_MULT = 1.002
+TREND_DOWN_MULT = 0.998
+RSI_BUY = 35.0
+RSI_BUY_TREND = 60.0
+RSI_SELL = 65.0
+RSI_SELL_TREND = 40.0
+
+
+@njit(cache=True)
+def sma(close, window):
+    """Simple Moving Average - wie rolling(window, min_periods=window).mean()"""
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    total = 0.0
+    count = 0
+    for i in range(n):
+        value = close[i]
+        if value == value:
+            total += value
+            count += 1
+        if i >= window:
+            old = close[i - window]
+            if old == old:
+                total -= old
+                count -= 1
+        if count >= window:
+            out[i] = total / count
+    return out
+
+
+@njit(cache=True)
+def ewm(values, alpha, min_periods):
+    """Exponentiell gewichteter Mittelwert - wie pandas ewm(alpha=..., adjust=False)"""
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    if n == 0:
+        return out
+    weighted = values[0]
+    nobs = 1 if weighted == weighted else 0
+    if nobs >= min_periods:
+        out[0] = weighted
+    old_wt_factor = 1.0 - alpha
+    old_wt = 1.0
+    for i in range(1, n):
+        cur = values[i]
+        is_observation = cur == cur
+        if is_observation:
+            nobs += 1
+        if weighted == weighted:
+            old_wt *= old_wt_factor
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = cur
+        if nobs >= min_periods:
+            out[i] = weighted
+    return out
+
+
+@njit(cache=True)
+def ema(close, window):
+    """Exponential Moving Average - wie ewm(span=window, min_periods=window, adjust=False)"""
+    return ewm(close, 2.0 / (window + 1.0), window)
+
+
+@njit(cache=True)
+def rsi(close, window):
+    """Relative Strength Index (Wilder-Glättung) - wie ta.momentum.RSIIndicator"""
+    n = close.shape[0]
+    up = np.zeros(n)
+    down = np.zeros(n)
+    for i in range(1, n):
+        diff = close[i] - close[i - 1]
+        if diff > 0:
+            up[i] = diff
+        elif diff < 0:
+            down[i] = -diff
+    emaup = ewm(up, 1.0 / window, window)
+    emadn = ewm(down, 1.0 / window, window)
+    out = np.full(n, np.nan)
+    for i in range(n):
+        if emadn[i] == 0:
+            out[i] = 100.0
+        else:
+            out[i] = 100.0 - 100.0 / (1.0 + emaup[i] / emadn[i])
+    return out
+
+
+@njit(cache=True)
+def _ewm_update(weighted, old_wt, nobs, value, alpha):
+    """Ein Schritt von ewm(adjust=False) mit Zustand (weighted, old_wt, nobs) - NaN wie pandas"""
+    is_observation = value == value
+    if is_observation:
+        nobs += 1
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if is_observation:
+            if weighted != value:
+                weighted = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+            old_wt = 1.0
+    elif is_observation:
+        weighted = value
+    return weighted, old_wt, nobs
+
+
+@njit(cache=True)
+def macd(close, window_fast, window_slow, window_sign):
+    """
+    MACD - gibt (macd, signal, histogram) zurück wie ta.trend.MACD
+    
+    Ein Durchlauf mit drei EMA-Zuständen (fast, slow, signal) statt drei ewm-Pässen
+    und temporärer Differenz-Reihe.
+    """
+    n = close.shape[0]
+    out_macd = np.full(n, np.nan)
+    out_signal = np.full(n, np.nan)
+    out_hist = np.full(n, np.nan)
+    alpha_fast = 2.0 / (window_fast + 1.0)
+    alpha_slow = 2.0 / (window_slow + 1.0)
+    alpha_sign = 2.0 / (window_sign + 1.0)
+    fast_w, fast_o, fast_n = np.nan, 1.0, 0
+    slow_w, slow_o, slow_n = np.nan, 1.0, 0
+    sign_w, sign_o, sign_n = np.nan, 1.0, 0
+    for i in range(n):
+        value = close[i]
+        fast_w, fast_o, fast_n = _ewm_update(fast_w, fast_o, fast_n, value, alpha_fast)
+        slow_w, slow_o, slow_n = _ewm_update(slow_w, slow_o, slow_n, value, alpha_slow)
+        line = np.nan
+        if fast_n >= window_fast and slow_n >= window_slow:
+            line = fast_w - slow_w
+        out_macd[i] = line
+        sign_w, sign_o, sign_n = _ewm_update(sign_w, sign_o, sign_n, line, alpha_sign)
+        if sign_n >= window_sign:
+            out_signal[i] = sign_w
+        out_hist[i] = line - out_signal[i]
+    return out_macd, out_signal, out_hist
+
+
+@njit(cache=True)
+def all_indicators(close, sma_window, ema_window, rsi_window, macd_fast, macd_slow, macd_sign):
+    """
+    SMA, EMA, RSI und MACD in einem Durchlauf über close
+    
+    Returns:
+        (sma, ema, rsi, macd, macd_signal, macd_histogram) - gleiche Werte wie die Einzel-Kernels
+    """
+    n = close.shape[0]
+    out_sma = np.full(n, np.nan)
+    out_ema = np.full(n, np.nan)
+    out_rsi = np.full(n, np.nan)
+    out_macd = np.full(n, np.nan)
+    out_signal = np.full(n, np.nan)
+    out_hist = np.full(n, np.nan)
+    
+    alpha_ema = 2.0 / (ema_window + 1.0)
+    alpha_fast = 2.0 / (macd_fast + 1.0)
+    alpha_slow = 2.0 / (macd_slow + 1.0)
+    alpha_sign = 2.0 / (macd_sign + 1.0)
+    alpha_rsi = 1.0 / rsi_window
+    
+    sma_total = 0.0
+    sma_count = 0
+    ema_w, ema_o, ema_n = np.nan, 1.0, 0
+    fast_w, fast_o, fast_n = np.nan, 1.0, 0
+    slow_w, slow_o, slow_n = np.nan, 1.0, 0
+    sign_w, sign_o, sign_n = np.nan, 1.0, 0
+    up_w, up_o, up_n = np.nan, 1.0, 0
+    down_w, down_o, down_n = np.nan, 1.0, 0
+    
+    for i in range(n):
+        value = close[i]
+        
+        # SMA
+        if value == value:
+            sma_total += value
+            sma_count += 1
+        if i >= sma_window:
+            old = close[i - sma_window]
+            if old == old:
+                sma_total -= old
+                sma_count -= 1
+        if sma_count >= sma_window:
+            out_sma[i] = sma_total / sma_count
+        
+        # EMA
+        ema_w, ema_o, ema_n = _ewm_update(ema_w, ema_o, ema_n, value, alpha_ema)
+        if ema_n >= ema_window:
+            out_ema[i] = ema_w
+        
+        # RSI (Wilder) - Differenz mit NaN zählt als 0 wie bei ta
+        gain = 0.0
+        loss = 0.0
+        if i > 0:
+            diff = value - close[i - 1]
+            if diff > 0:
+                gain = diff
+            elif diff < 0:
+                loss = -diff
+        up_w, up_o, up_n = _ewm_update(up_w, up_o, up_n, gain, alpha_rsi)
+        down_w, down_o, down_n = _ewm_update(down_w, down_o, down_n, loss, alpha_rsi)
+        if down_n >= rsi_window:
+            if down_w == 0:
+                out_rsi[i] = 100.0
+            else:
+                out_rsi[i] = 100.0 - 100.0 / (1.0 + up_w / down_w)
+        
+        # MACD
+        fast_w, fast_o, fast_n = _ewm_update(fast_w, fast_o, fast_n, value, alpha_fast)
+        slow_w, slow_o, slow_n = _ewm_update(slow_w, slow_o, slow_n, value, alpha_slow)
+        line = np.nan
+        if fast_n >= macd_fast and slow_n >= macd_slow:
+            line = fast_w - slow_w
+        out_macd[i] = line
+        sign_w, sign_o, sign_n = _ewm_update(sign_w, sign_o, sign_n, line, alpha_sign)
+        if sign_n >= macd_sign:
+            out_signal[i] = sign_w
+        out_hist[i] = line - out_signal[i]
+    
+    return out_sma, out_ema, out_rsi, out_macd, out_signal, out_hist
+
+
+@njit(cache=True)
+def signal_rules(rsi, macd, macd_signal, price, ema):
+    """
+    Handelsregeln von generate_signal für einen Bar
+    
+    Returns:
+        (signal, trend) als Codes: 0=HOLD/NEUTRAL, 1=BUY/UP, 2=SELL/DOWN
+    """
+    if math.isnan(rsi) or math.isnan(macd) or math.isnan(macd_signal):
+        return 0, 0
+    
+    trend = 0
+    if not math.isnan(ema) and not math.isnan(price):
+        if price > ema * TREND_UP_MULT:
+            trend = 1
+        elif price < ema * TREND_DOWN_MULT:
+            trend = 2
+    
+    signal = 0
+    if rsi < RSI_BUY and macd > macd_signal:
+        signal = 1
+    elif trend == 1 and rsi < RSI_BUY_TREND and macd > macd_signal:
+        signal = 1
+    elif rsi > RSI_SELL and macd < macd_signal:
+        signal = 2
+    elif trend == 2 and rsi > RSI_SELL_TREND and macd < macd_signal:
+        signal = 2
+    return signal, trend
+
+
+def _ewm_lfilter(values, alpha, min_periods):
+    """ewm(alpha=..., adjust=False) über lückenlose values als IIR-Filter (scipy)"""
+    decay = 1.0 - alpha
+    out, _ = lfilter([alpha], [1.0, -decay], values, zi=[decay * values[0]])
+    out[:min_periods - 1] = np.nan
+    return out
+
+
+def all_indicators_np(close, sma_window, ema_window, rsi_window, macd_fast, macd_slow, macd_sign):
+    """
+    NumPy/scipy-Variante von all_indicators für Umgebungen ohne Numba
+    
+    Nur für lückenlose Reihen (keine NaN in close) - sonst ta verwenden.
+    Werte stimmen mit ta bis auf Rundung überein.
+    """
+    n = close.shape[0]
+    
+    out_sma = np.full(n, np.nan)
+    if n >= sma_window:
+        csum = np.cumsum(np.concatenate(([0.0], close)))
+        out_sma[sma_window - 1:] = (csum[sma_window:] - csum[:-sma_window]) / sma_window
+    
+    out_ema = _ewm_lfilter(close, 2.0 / (ema_window + 1.0), ema_window)
+    
+    diff = np.diff(close, prepend=close[0])
+    up = _ewm_lfilter(np.maximum(diff, 0.0), 1.0 / rsi_window, rsi_window)
+    down = _ewm_lfilter(np.maximum(-diff, 0.0), 1.0 / rsi_window, rsi_window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out_rsi = np.where(down == 0, 100.0, 100.0 - 100.0 / (1.0 + up / down))
+    out_rsi[np.isnan(down)] = np.nan
+    
+    out_macd = (_ewm_lfilter(close, 2.0 / (macd_fast + 1.0), macd_fast)
+                - _ewm_lfilter(close, 2.0 / (macd_slow + 1.0), macd_slow))
+    out_signal = np.full(n, np.nan)
+    if n >= macd_slow:
+        out_signal[macd_slow - 1:] = _ewm_lfilter(out_macd[macd_slow - 1:], 2.0 / (macd_sign + 1.0), macd_sign)
+    out_hist = out_macd - out_signal
+    
+    return out_sma, out_ema, out_rsi, out_macd, out_signal, out_hist
+
+
+def warm_up():
+    """
+    Kompiliert alle Kernels vorab mit den Typen der echten Aufrufe
+    (float64-Array, int-Fenster) - bei cache=True nur ein Laden aus dem Disk-Cache.
+    Der erste Tick nach dem Deployment zahlt so keine JIT-Latenz.
+    """
+    dummy = np.linspace(1.0, 2.0, 64)
+    sma(dummy, 20)
+    ema(dummy, 20)
+    rsi(dummy, 14)
+    macd(dummy, 12, 26, 9)
+    all_indicators(dummy, 20, 20, 14, 12, 26, 9)
+    signal_rules(50.0, 0.0, 0.0, 1.0, 1.0)
+
+
+if NUMBA_AVAILABLE:
+    try:
+        warm_up()
+    except Exception:
+        # Kompilierung wird dann beim ersten echten Aufruf nachgeholt
+        pass
@@ -24,6 +24,14 @@ if sys.platform == 'darwin':  # macOS
     except Exception as e:
         logger.warning(f"⚠️ Could not set event loop policy: {e}")
 
+def _invalidate_positions_cache():
+    """Nach Order/Close die gecachten offenen Positionen (commodity_processor) verwerfen"""
+    # Nur wenn geladen - sonst gibt es keinen Cache (z.B. im SDK-Worker-Prozess)
+    commodity_processor = sys.modules.get('commodity_processor')
+    if commodity_processor is not None:
+        commodity_processor.invalidate_open_positions_cache()
+
+
 class MetaAPISDKConnector:
     """MetaAPI SDK-basierter Connector - viel stabiler!"""
     
@@ -348,6 +356,9 @@ class MetaAPISDKConnector:
         except Exception as e:
             logger.error(f"❌ Order execution error: {e}", exc_info=True)
             return {'success': False, 'error': f'Trade execution failed: {str(e)}'}
+        finally:
+            # Auch bei Timeout/Fehler - die Order kann trotzdem ausgeführt worden sein
+            _invalidate_positions_cache()
     
     async def close_position(self, position_id: str) -> dict:
         """
@@ -403,6 +414,8 @@ class MetaAPISDKConnector:
                     'error': f'Fehler beim Schließen: {str(e)[:100]}',
                     'error_type': 'UNKNOWN'
                 }
+        finally:
+            _invalidate_positions_cache()
     
     async def disconnect(self):
         """Verbindung trennen"""
@@ -46,21 +46,27 @@ async def migrate():
         mongo_trades = await mongo_db.trades.find({}).to_list(None)
         migrated_trades = 0
         for trade in mongo_trades:
-            try:
-                trade.pop('_id', None)
-                
-                # Convert timestamp strings to datetime if needed
-                for key in ['timestamp', 'closed_at', 'opened_at']:
-                    if key in trade and isinstance(trade[key], str):
-                        try:
-                            trade[key] = datetime.fromisoformat(trade[key].replace('Z', '+00:00'))
-                        except:
-                            pass
-                
-                await trades.insert_one(trade)
-                migrated_trades += 1
-            except Exception as e:
-                logger.error(f"❌ Fehler bei Trade {trade.get('id')}: {e}")
+            trade.pop('_id', None)
+            
+            # Convert timestamp strings to datetime if needed
+            for key in ['timestamp', 'closed_at', 'opened_at']:
+                if key in trade and isinstance(trade[key], str):
+                    try:
+                        trade[key] = datetime.fromisoformat(trade[key].replace('Z', '+00:00'))
+                    except:
+                        pass
+        
+        try:
+            # Ein executemany pro Chunk statt Commit pro Trade
+            migrated_trades = await trades.insert_many(mongo_trades)
+        except Exception as e:
+            logger.warning(f"⚠️ Bulk-Insert fehlgeschlagen ({e}), migriere Trades einzeln...")
+            for trade in mongo_trades:
+                try:
+                    await trades.insert_one(trade)
+                    migrated_trades += 1
+                except Exception as e:
+                    logger.error(f"❌ Fehler bei Trade {trade.get('id')}: {e}")
         
         logger.info(f"✅ {migrated_trades} Trades migriert")
         
@@ -109,12 +115,14 @@ async def migrate():
         
         migrated_history = 0
         for hist in mongo_history:
-            try:
-                hist.pop('_id', None)
-                await market_data_history.insert_one(hist)
-                migrated_history += 1
-            except Exception as e:
-                logger.error(f"❌ Fehler bei History: {e}")
+            hist.pop('_id', None)
+        
+        try:
+            # Kein Einzel-Fallback: History hat keinen eindeutigen Schlüssel,
+            # bereits committete Chunks würden doppelt eingefügt
+            migrated_history = await market_data_history.insert_many(mongo_history)
+        except Exception as e:
+            logger.error(f"❌ Fehler bei History: {e}")
         
         logger.info(f"✅ {migrated_history} History Einträge migriert")
         
@@ -864,7 +864,7 @@ async def process_commodity_market_data(commodity_id: str, settings):
         
         # Calculate indicators if not already present
         if hist is not None and 'RSI' not in hist.columns:
-            hist = calculate_indicators(hist)
+            hist = calculate_indicators(hist, cache_key=(commodity_id, 'market_data'))
             
             # Check again if calculate_indicators returned None
             if hist is None or hist.empty:
@@ -1634,7 +1634,7 @@ async def get_ohlcv_data(
 async def get_market_hours_status():
     """Get current market hours status for all enabled commodities"""
     try:
-        from commodity_market_hours import get_market_hours, is_market_open
+        from commodity_market_hours import get_market_hours, are_markets_open
         
         settings = await db.trading_settings.find_one({"id": "trading_settings"})
         if not settings:
@@ -1648,9 +1648,10 @@ async def get_market_hours_status():
         market_status = {}
         any_market_open = False
         current_time = datetime.now(timezone.utc)
+        open_status = are_markets_open(enabled_commodities, market_hours, current_time)
         
         for commodity_id in enabled_commodities:
-            is_open = is_market_open(commodity_id, market_hours, current_time)
+            is_open = open_status[commodity_id]
             hours_config = market_hours.get(commodity_id, {})
             
             market_status[commodity_id] = {
@@ -1683,21 +1684,19 @@ async def get_market_hours_status():
 async def get_all_market_hours():
     """Get market hours configuration for ALL commodities"""
     try:
-        from commodity_market_hours import get_market_hours, DEFAULT_MARKET_HOURS
+        from commodity_market_hours import get_market_hours
         
-        # Hole Custom Hours aus DB (oder Defaults)
+        # Hole Custom Hours aus DB (über Defaults gelegt, read-only)
         market_hours = await get_market_hours(db)
         
         # Füge alle Commodities hinzu (auch die nicht enabled)
         all_hours = {}
         for commodity_id in COMMODITIES.keys():
             if commodity_id in market_hours:
-                all_hours[commodity_id] = market_hours[commodity_id]
-            elif commodity_id in DEFAULT_MARKET_HOURS:
-                all_hours[commodity_id] = DEFAULT_MARKET_HOURS[commodity_id]
+                hours = market_hours[commodity_id]
             else:
                 # Fallback: Standard 24/5
-                all_hours[commodity_id] = {
+                hours = {
                     "enabled": True,
                     "days": [0, 1, 2, 3, 4],
                     "open_time": "00:00",
@@ -1706,9 +1705,12 @@ async def get_all_market_hours():
                     "description": "Standard 24/5"
                 }
             
-            # Füge Commodity-Info hinzu
-            all_hours[commodity_id]["commodity_name"] = COMMODITIES.get(commodity_id, {}).get("name", commodity_id)
-            all_hours[commodity_id]["commodity_category"] = COMMODITIES.get(commodity_id, {}).get("category", "Unbekannt")
+            # Kopie mit Commodity-Info (gecachte Handelszeiten nicht verändern)
+            all_hours[commodity_id] = {
+                **hours,
+                "commodity_name": COMMODITIES.get(commodity_id, {}).get("name", commodity_id),
+                "commodity_category": COMMODITIES.get(commodity_id, {}).get("category", "Unbekannt")
+            }
         
         return {
             "success": True,
@@ -1738,7 +1740,7 @@ async def update_commodity_market_hours(request: dict):
         return {
             "success": True,
             "message": f"Handelszeiten für {commodity_id} aktualisiert",
-            "market_hours": updated_hours
+            "market_hours": dict(updated_hours)
         }
         
     except Exception as e:
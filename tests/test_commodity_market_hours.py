@@ -0,0 +1,72 @@
+"""
+Tests für backend/commodity_market_hours.py - Bitmap-Auswertung gegen die
+ursprüngliche Zeitvergleichs-Logik von is_market_open
+"""
+
+import sys
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import commodity_market_hours  # noqa: E402
+
+
+def _reference_is_open(hours, current_time):
+    """is_market_open vor der Bitmap-Umstellung (datetime.time-Vergleiche)"""
+    if not hours.get("enabled", True):
+        return False
+    current_weekday = current_time.weekday()
+    if hours.get("is_24_7", False):
+        return True
+    if hours.get("is_24_5", False):
+        if current_weekday in [0, 1, 2, 3]:
+            return True
+        if current_weekday == 6:
+            open_hour, open_min = map(int, hours.get("open_time", "22:00").split(":"))
+            return current_time.time() >= time(open_hour, open_min)
+        if current_weekday == 4:
+            close_hour, close_min = map(int, hours.get("close_time", "21:00").split(":"))
+            return current_time.time() <= time(close_hour, close_min)
+        return False
+    if current_weekday not in hours.get("days", [0, 1, 2, 3, 4]):
+        return False
+    open_hour, open_min = map(int, hours.get("open_time", "00:00").split(":"))
+    close_hour, close_min = map(int, hours.get("close_time", "23:59").split(":"))
+    return time(open_hour, open_min) <= current_time.time() <= time(close_hour, close_min)
+
+
+_CUSTOM_HOURS = {
+    "DISABLED": {"enabled": False, "days": [0, 1, 2, 3, 4], "open_time": "08:00", "close_time": "17:00"},
+    "WEEKEND": {"enabled": True, "days": [5, 6], "open_time": "10:15", "close_time": "10:16"},
+    "FULL_DAY": {"enabled": True, "days": [0, 2, 4], "open_time": "00:00", "close_time": "23:59"},
+    "SINGLE_MINUTE": {"enabled": True, "days": [1], "open_time": "12:30", "close_time": "12:30"},
+    "OVERNIGHT": {"enabled": True, "days": [0, 1, 2, 3, 4], "open_time": "22:00", "close_time": "06:00"},
+    "CUSTOM_24_5": {"enabled": True, "is_24_5": True, "open_time": "23:30", "close_time": "20:45"},
+    "CRYPTO": {"enabled": True, "is_24_7": True},
+}
+_ALL_HOURS = {**commodity_market_hours.DEFAULT_MARKET_HOURS, **_CUSTOM_HOURS}
+# Montag 00:00 UTC
+_WEEK_START = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("offset", [timedelta(0), timedelta(microseconds=1), timedelta(seconds=30),
+                                    timedelta(seconds=59, microseconds=999999)])
+def test_every_minute_of_the_week_matches_time_comparison(offset):
+    ids = list(_ALL_HOURS)
+    for minute in range(7 * commodity_market_hours.MINUTES_PER_DAY):
+        current_time = _WEEK_START + timedelta(minutes=minute) + offset
+        result = commodity_market_hours.are_markets_open(ids, _ALL_HOURS, current_time)
+        for commodity_id, hours in _ALL_HOURS.items():
+            expected = _reference_is_open(hours, current_time)
+            assert result[commodity_id] == expected, (commodity_id, current_time)
+            assert commodity_market_hours.is_market_open(commodity_id, _ALL_HOURS, current_time) == expected
+
+
+def test_close_minute_is_exclusive_after_the_full_minute():
+    friday_close = datetime(2026, 1, 9, 21, 0, tzinfo=timezone.utc)
+    assert commodity_market_hours.is_market_open("GOLD", current_time=friday_close)
+    assert not commodity_market_hours.is_market_open("GOLD", current_time=friday_close + timedelta(seconds=1))
+    assert commodity_market_hours.is_market_open("GOLD", current_time=friday_close - timedelta(seconds=1))
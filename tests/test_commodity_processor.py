@@ -0,0 +1,94 @@
+"""
+Tests für backend/commodity_processor.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import commodity_processor  # noqa: E402
+
+
+class _FakeMultiPlatform:
+    def __init__(self):
+        self.calls = 0
+        self.positions = [{'price_open': 100.0, 'volume': 0.1}]
+
+    async def get_open_positions(self, platform):
+        self.calls += 1
+        return list(self.positions)
+
+
+def test_open_positions_cache_is_invalidated_after_orders():
+    connector = _FakeMultiPlatform()
+
+    async def scenario():
+        commodity_processor.invalidate_open_positions_cache()
+        first = await commodity_processor._get_open_positions_cached(connector, 'MT5_LIBERTEX_DEMO')
+        # Innerhalb der TTL: kein zweiter Roundtrip
+        await commodity_processor._get_open_positions_cached(connector, 'MT5_LIBERTEX_DEMO')
+        connector.positions.append({'price_open': 200.0, 'volume': 0.2})
+        commodity_processor.invalidate_open_positions_cache()
+        after_order = await commodity_processor._get_open_positions_cached(connector, 'MT5_LIBERTEX_DEMO')
+        return first, after_order
+
+    first, after_order = asyncio.run(scenario())
+    assert len(first) == 1
+    assert len(after_order) == 2
+    assert connector.calls == 2
+
+
+def _ohlcv(close):
+    import pandas as pd
+    close = pd.Series(close, dtype='float64')
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 100.0})
+
+
+def test_compact_ohlcv_keeps_float64_for_large_prices_and_crypto():
+    gold = commodity_processor._compact_ohlcv(_ohlcv([2345.67, 2346.01]), 'GOLD')
+    bitcoin = commodity_processor._compact_ohlcv(_ohlcv([0.5, 0.6]), 'BITCOIN')
+    wheat = commodity_processor._compact_ohlcv(_ohlcv([5.4321, 5.5]), 'WHEAT')
+
+    assert gold['Close'].dtype == 'float64'
+    assert gold['Close'].tolist() == [2345.67, 2346.01]
+    assert bitcoin['Close'].dtype == 'float64'
+    assert wheat['Close'].dtype == 'float32'
+    assert abs(float(wheat['Close'].iloc[0]) - 5.4321) < 1e-6
+    assert wheat['Volume'].dtype == 'int32'
+
+
+class _FakeCandleConnector:
+    def __init__(self, candles):
+        self.candles = candles
+        self.requests = []
+
+    async def get_candles(self, symbol, timeframe, limit):
+        self.requests.append(symbol)
+        return self.candles
+
+
+def test_fetch_metaapi_candles_uses_legacy_platform_keys(monkeypatch):
+    candle = {'time': '2026-01-02T10:00:00Z', 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10}
+    icmarkets = _FakeCandleConnector([])
+    libertex = _FakeCandleConnector([candle])
+    demo = _FakeCandleConnector([candle])
+
+    class _Platforms:
+        # Inaktiv und ohne _DEMO-Suffix - wie vor der Index-Umstellung trotzdem genutzt
+        platforms = {
+            'MT5_ICMARKETS': {'active': False, 'connector': icmarkets},
+            'MT5_LIBERTEX': {'active': False, 'connector': libertex},
+            'MT5_ICMARKETS_DEMO': {'active': True, 'connector': demo},
+        }
+
+    monkeypatch.setattr(commodity_processor, '_platform_connector', _Platforms())
+    df = asyncio.run(commodity_processor.fetch_metaapi_candles('GOLD'))
+
+    gold = commodity_processor.COMMODITIES['GOLD']
+    # ICMarkets zuerst, bei leerer Antwort Libertex; der _DEMO-Key wird nicht gefragt
+    assert icmarkets.requests == [gold['mt5_icmarkets_symbol']]
+    assert libertex.requests == [gold['mt5_libertex_symbol']]
+    assert demo.requests == []
+    assert df['Close'].tolist() == [1.5]
@@ -0,0 +1,205 @@
+"""
+Tests für die Legacy-SQLite-Collections (backend/database.py)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import database  # noqa: E402
+
+
+def _run(tmp_path, scenario):
+    """scenario(db) gegen eine frische Datenbank in tmp_path ausführen"""
+    async def main():
+        db = database.Database(str(tmp_path / 'trading.db'))
+        await db.connect()
+        await db.initialize_schema()
+        try:
+            return await scenario(db)
+        finally:
+            await db.close()
+    return asyncio.run(main())
+
+
+def test_trade_settings_upsert_without_status_stores_null(tmp_path):
+    async def scenario(db):
+        settings = database.TradeSettings(db)
+        await settings.update_one(
+            {'trade_id': 'mt5_1'},
+            {'$set': {'stop_loss': 1.5, 'take_profit': 2.5}},
+            upsert=True
+        )
+        return await settings.find_one({'trade_id': 'mt5_1'})
+
+    row = _run(tmp_path, scenario)
+    # Kein DEFAULT 'OPEN' - sonst zählt der Eintrag als offene KI-Position
+    assert row['status'] is None
+    assert row['stop_loss'] == 1.5
+    assert row['take_profit'] == 2.5
+
+
+def test_trade_settings_partial_upsert_keeps_other_fields(tmp_path):
+    async def scenario(db):
+        settings = database.TradeSettings(db)
+        await settings.update_one(
+            {'trade_id': 'mt5_1'},
+            {'$set': {'stop_loss': 1.5, 'take_profit': 2.5, 'status': 'OPEN'}},
+            upsert=True
+        )
+        await settings.update_one({'trade_id': 'mt5_1'}, {'$set': {'take_profit': 3.0}}, upsert=True)
+        return await settings.find_one({'trade_id': 'mt5_1'})
+
+    row = _run(tmp_path, scenario)
+    assert row['stop_loss'] == 1.5
+    assert row['take_profit'] == 3.0
+    assert row['status'] == 'OPEN'
+
+
+def test_market_data_partial_upsert_on_existing_commodity(tmp_path):
+    async def scenario(db):
+        market_data = database.MarketData(db)
+        await market_data.update_one(
+            {'commodity': 'GOLD'},
+            {'$set': {'commodity': 'GOLD', 'timestamp': '2026-01-01T00:00:00', 'price': 2000.0,
+                      'rsi': 55.0, 'data_source': 'live'}},
+            upsert=True
+        )
+        # Ohne timestamp/price - darf nicht an NOT NULL scheitern
+        await market_data.update_one({'commodity': 'GOLD'}, {'$set': {'trend': 'UP'}}, upsert=True)
+        return await market_data.find_one({'commodity': 'GOLD'})
+
+    row = _run(tmp_path, scenario)
+    assert row['trend'] == 'UP'
+    assert row['price'] == 2000.0
+    assert row['rsi'] == 55.0
+    assert row['data_source'] == 'live'
+
+
+def test_market_data_partial_upsert_inserts_missing_commodity(tmp_path):
+    async def scenario(db):
+        market_data = database.MarketData(db)
+        await market_data.update_one(
+            {'commodity': 'SILVER'},
+            {'$set': {'timestamp': '2026-01-01T00:00:00', 'price': 25.0}},
+            upsert=True
+        )
+        await market_data.update_one({'commodity': 'OIL'}, {'$set': {'trend': 'UP'}})
+        return (await market_data.find_one({'commodity': 'SILVER'}),
+                await market_data.find_one({'commodity': 'OIL'}))
+
+    silver, oil = _run(tmp_path, scenario)
+    assert silver['price'] == 25.0
+    assert oil is None
+
+
+def _trade(trade_id):
+    return {'id': trade_id, 'timestamp': '2026-01-01T00:00:00', 'commodity': 'GOLD',
+            'type': 'BUY', 'price': 2000.0, 'entry_price': 2000.0, 'quantity': 0.1}
+
+
+def test_writes_inside_transaction_join_it_without_deadlock(tmp_path):
+    async def scenario(db):
+        trades = database.Trades(db)
+        outside = {}
+        written = asyncio.Event()
+        read_done = asyncio.Event()
+
+        async def read_from_other_task():
+            await written.wait()
+            outside['count'] = await trades.count_documents()
+            read_done.set()
+
+        # Außerhalb der Transaktion gestartet - erbt deren Kontext nicht
+        reader_task = asyncio.create_task(read_from_other_task())
+        async with db.transaction():
+            # Standard auto_commit=True - darf nicht auf _write_lock warten
+            await asyncio.wait_for(trades.insert_one(_trade('t1')), timeout=5)
+            await asyncio.wait_for(trades.insert_many([_trade('t2'), _trade('t3')]), timeout=5)
+            await asyncio.wait_for(trades.update_one({'id': 't1'}, {'$set': {'status': 'CLOSED'}}), timeout=5)
+            # Noch nicht committet: anderer Task sieht nichts, der eigene alles
+            written.set()
+            await asyncio.wait_for(read_done.wait(), timeout=5)
+            inside = await trades.count_documents()
+        await reader_task
+        return outside['count'], inside, await trades.count_documents()
+
+    outside, inside, after = _run(tmp_path, scenario)
+    assert outside == 0
+    assert inside == 3
+    assert after == 3
+
+
+def test_transaction_rolls_back_joined_writes(tmp_path):
+    async def scenario(db):
+        trades = database.Trades(db)
+        try:
+            async with db.transaction():
+                await trades.insert_one(_trade('t1'))
+                raise RuntimeError('abbrechen')
+        except RuntimeError:
+            pass
+        return await trades.count_documents()
+
+    assert _run(tmp_path, scenario) == 0
+
+
+def test_unknown_sort_field_is_ignored(tmp_path):
+    async def scenario(db):
+        trades = database.Trades(db)
+        await trades.insert_many([_trade('t1'), _trade('t2')])
+        cursor = await trades.find({})
+        # Kein ValueError aus sort(), kein Feldname im SQL - nur ohne ORDER BY
+        return await cursor.sort('timestamp; DROP TABLE trades', -1).to_list(10)
+
+    rows = _run(tmp_path, scenario)
+    assert sorted(row['id'] for row in rows) == ['t1', 't2']
+
+
+def test_bulk_update_sets_fields_for_all_ids(tmp_path):
+    async def scenario(db):
+        trades = database.Trades(db)
+        await trades.insert_many([_trade('t1'), _trade('t2'), _trade('t3')])
+        updated = await trades.bulk_update(['t1', 't3'], {'$set': {'status': 'CLOSED', 'exit_price': 2010.0}})
+        closed = await (await trades.find({'status': 'CLOSED'})).to_list(10)
+        return updated, closed
+
+    updated, closed = _run(tmp_path, scenario)
+    assert updated == 2
+    assert sorted(row['id'] for row in closed) == ['t1', 't3']
+    assert all(row['exit_price'] == 2010.0 for row in closed)
+
+
+def test_bulk_update_rejects_unknown_fields(tmp_path):
+    async def scenario(db):
+        trades = database.Trades(db)
+        await trades.insert_one(_trade('t1'))
+        try:
+            await trades.bulk_update(['t1'], {'$set': {'status = NULL; --': 'x'}})
+        except ValueError:
+            return True
+        return False
+
+    assert _run(tmp_path, scenario)
+
+
+def test_count_estimate_uses_analyze_statistics(tmp_path):
+    async def scenario(db):
+        trades = database.Trades(db)
+        # Ohne Statistik: exakte Zählung
+        await trades.insert_many([_trade(f't{i}') for i in range(5)])
+        before = await trades.count_estimate()
+        await trades.insert_many([_trade(f'u{i}') for i in range(5)])
+        await db.execute_with_retry("ANALYZE")
+        after_analyze = await trades.count_estimate()
+        await trades.insert_one(_trade('v1'))
+        # Stand des letzten ANALYZE, kein Scan
+        return before, after_analyze, await trades.count_documents({}, exact=False), await trades.count_documents()
+
+    before, after_analyze, estimate, exact = _run(tmp_path, scenario)
+    assert before == 5
+    assert after_analyze == 10
+    assert estimate == 10
+    assert exact == 11
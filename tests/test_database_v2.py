@@ -0,0 +1,251 @@
+"""
+Tests für die Multi-DB-Architektur (backend/database_v2.py) - der Pfad, der
+zur Laufzeit hinter database.trades / trading_settings / market_data steht
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import database_v2  # noqa: E402
+
+
+@pytest.fixture
+def db_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_v2, '_DB_DIR', tmp_path)
+    return tmp_path
+
+
+def _run(database_class, scenario):
+    """scenario(db) gegen eine frische Datenbank der Klasse ausführen"""
+    async def main():
+        db = database_class()
+        await db.connect()
+        await db.initialize_schema()
+        try:
+            return await scenario(db)
+        finally:
+            await db.close()
+    return asyncio.run(main())
+
+
+def test_trading_settings_update_merges_top_level_keys(db_dir):
+    async def scenario(db):
+        settings = database_v2.TradingSettingsWrapper(db)
+        await settings.update_one(
+            {'id': 'trading_settings'},
+            {'$set': {'auto_trading': False, 'limits': {'gold': 1, 'oil': 2}, 'note': 'ä'}},
+            upsert=True
+        )
+        await settings.update_one(
+            {'id': 'trading_settings'},
+            {'$set': {'auto_trading': True, 'limits': {'gold': 3}, 'risk': None}}
+        )
+        return await settings.find_one({'id': 'trading_settings'})
+
+    data = _run(database_v2.SettingsDatabase, scenario)
+    # Wie dict.update(): verschachtelte Dicts werden ersetzt, None bleibt erhalten
+    assert data == {'auto_trading': True, 'limits': {'gold': 3}, 'note': 'ä',
+                    'id': 'trading_settings', 'risk': None}
+
+
+def test_trading_settings_update_without_upsert_skips_missing_row(db_dir):
+    async def scenario(db):
+        settings = database_v2.TradingSettingsWrapper(db)
+        await settings.update_one({'id': 'trading_settings'}, {'$set': {'auto_trading': True}})
+        return await settings.find_one({'id': 'trading_settings'})
+
+    assert _run(database_v2.SettingsDatabase, scenario) is None
+
+
+def test_trading_settings_update_with_many_keys(db_dir):
+    keys = {f'key_{i}': i for i in range(200)}
+
+    async def scenario(db):
+        settings = database_v2.TradingSettingsWrapper(db)
+        await settings.update_one({'id': 'trading_settings'}, {'$set': {'first': 1}}, upsert=True)
+        # Mehr als 63 Schlüssel - verschachtelte json_set-Aufrufe
+        await settings.update_one({'id': 'trading_settings'}, {'$set': keys}, upsert=True)
+        return await settings.find_one({'id': 'trading_settings'})
+
+    data = _run(database_v2.SettingsDatabase, scenario)
+    assert data == {'first': 1, 'id': 'trading_settings', **keys}
+
+
+def test_trading_settings_keys_with_quotes_use_merge_path(db_dir):
+    async def scenario(db):
+        settings = database_v2.TradingSettingsWrapper(db)
+        await settings.update_one({'id': 'trading_settings'}, {'$set': {'a': 1}}, upsert=True)
+        await settings.update_one({'id': 'trading_settings'}, {'$set': {'say "hi"': 2}}, upsert=True)
+        return await settings.find_one({'id': 'trading_settings'})
+
+    assert _run(database_v2.SettingsDatabase, scenario) == {'a': 1, 'id': 'trading_settings', 'say "hi"': 2}
+
+
+def test_large_settings_document_round_trips(db_dir):
+    # > 64 KB - wird im Thread geparst
+    big = {f'symbol_{i}': {'enabled': i % 2 == 0, 'note': 'x' * 100} for i in range(1000)}
+
+    async def scenario(db):
+        settings = database_v2.TradingSettingsWrapper(db)
+        await settings.insert_one({'id': 'trading_settings', **big})
+        async with db._conn.execute("SELECT typeof(data) FROM trading_settings") as cursor:
+            stored_type = (await cursor.fetchone())[0]
+        return stored_type, await settings.find_one({'id': 'trading_settings'})
+
+    stored_type, data = _run(database_v2.SettingsDatabase, scenario)
+    # TEXT, nicht BLOB - sonst scheitert json_set beim nächsten Update
+    assert stored_type == 'text'
+    assert data == {'id': 'trading_settings', **big}
+
+
+def test_market_data_upsert_replaces_row(db_dir):
+    async def scenario(db):
+        market_data = database_v2.MarketDataWrapper(db)
+        await market_data.update_one(
+            {'commodity': 'GOLD'},
+            {'$set': {'timestamp': '2026-01-01T00:00:00', 'price': 2000.0, 'rsi': 55.0, 'trend': 'UP'}},
+            upsert=True
+        )
+        await market_data.update_one(
+            {'commodity': 'GOLD'},
+            {'$set': {'timestamp': '2026-01-01T00:01:00', 'price': 2001.0, 'rsi': 56.0}},
+            upsert=True
+        )
+        async with db._conn.execute("SELECT COUNT(*) FROM market_data") as cursor:
+            count = (await cursor.fetchone())[0]
+        return count, await market_data.find_one({'commodity': 'GOLD'})
+
+    count, row = _run(database_v2.MarketDataDatabase, scenario)
+    assert count == 1
+    assert row['price'] == 2001.0
+    assert row['rsi'] == 56.0
+    assert row['timestamp'] == '2026-01-01T00:01:00'
+    # Vollständige Zeile je Tick - nicht übergebene Felder werden geleert
+    assert row['trend'] is None
+
+
+def test_trade_settings_upsert_inserts_with_null_defaults(db_dir):
+    async def scenario(db):
+        settings = database_v2.TradeSettingsWrapper(db)
+        await settings.update_one({'trade_id': 'mt5_1'}, {'$set': {'stop_loss': 1.5, 'take_profit': 2.5}}, upsert=True)
+        return await settings.find_one({'trade_id': 'mt5_1'})
+
+    row = _run(database_v2.TradesDatabase, scenario)
+    assert row['stop_loss'] == 1.5
+    assert row['take_profit'] == 2.5
+    assert row['status'] is None
+
+
+def test_trade_settings_upsert_updates_only_given_fields(db_dir):
+    async def scenario(db):
+        settings = database_v2.TradeSettingsWrapper(db)
+        await settings.insert_one({'trade_id': 'mt5_1', 'stop_loss': 1.5, 'take_profit': 2.5,
+                                   'status': 'OPEN', 'strategy': 'day'})
+        await settings.update_one({'trade_id': 'mt5_1'}, {'$set': {'take_profit': 3.0}}, upsert=True)
+        await settings.update_one({'trade_id': 'mt5_1'}, {'$set': {}}, upsert=True)
+        return await settings.find_one({'trade_id': 'mt5_1'})
+
+    row = _run(database_v2.TradesDatabase, scenario)
+    assert row['stop_loss'] == 1.5
+    assert row['take_profit'] == 3.0
+    assert row['status'] == 'OPEN'
+    assert row['strategy'] == 'day'
+
+
+def test_connect_enables_mmap_and_close_stops_optimize_loop(db_dir):
+    async def main():
+        db = database_v2.MarketDataDatabase()
+        await db.connect()
+        async with db._conn.execute("PRAGMA mmap_size") as cursor:
+            mmap_size = (await cursor.fetchone())[0]
+        optimize_task = db._optimize_task
+        await db.close()
+        await asyncio.sleep(0)
+        return mmap_size, optimize_task.cancelled(), db._optimize_task
+
+    mmap_size, cancelled, task_after_close = asyncio.run(main())
+    assert mmap_size == database_v2._MMAP_SIZE
+    assert cancelled
+    assert task_after_close is None
+
+
+def test_get_trades_and_price_history_sort_via_index(db_dir):
+    async def plan(db, query, params):
+        async with db._conn.execute("EXPLAIN QUERY PLAN " + query, params) as cursor:
+            return ' '.join(row[3] for row in await cursor.fetchall())
+
+    async def trades_scenario(db):
+        return await plan(db, "SELECT * FROM trades WHERE status = ? ORDER BY timestamp DESC LIMIT ?", ('OPEN', 10))
+
+    async def history_scenario(db):
+        return await plan(db, "SELECT * FROM market_data_history WHERE commodity = ? "
+                              "ORDER BY timestamp DESC LIMIT ?", ('GOLD', 10))
+
+    trades_plan = _run(database_v2.TradesDatabase, trades_scenario)
+    history_plan = _run(database_v2.MarketDataDatabase, history_scenario)
+    assert 'idx_trades_status_ts' in trades_plan
+    assert 'TEMP B-TREE' not in trades_plan
+    assert 'TEMP B-TREE' not in history_plan
+
+
+def test_get_trades_binds_limit(db_dir):
+    async def scenario(db):
+        for i in range(3):
+            await db.insert_trade({'id': f't{i}', 'timestamp': f'2026-01-0{i + 1}T00:00:00',
+                                   'commodity': 'GOLD', 'type': 'BUY', 'status': 'OPEN'})
+        trades = database_v2.TradesWrapper(db)
+        return await (await trades.find({'status': 'OPEN'})).to_list(2)
+
+    rows = _run(database_v2.TradesDatabase, scenario)
+    assert [row['id'] for row in rows] == ['t2', 't1']
+
+
+def test_history_insert_skips_sqlite_sequence(db_dir):
+    async def scenario(db):
+        await db.add_history_entry('GOLD', 2000.0, source='live')
+        async with db._conn.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_sequence'") as cursor:
+            sequence_table = await cursor.fetchone()
+        return sequence_table, await db.get_price_history('GOLD')
+
+    sequence_table, history = _run(database_v2.MarketDataDatabase, scenario)
+    assert sequence_table is None
+    assert [row['price'] for row in history] == [2000.0]
+
+
+def test_trades_insert_many(db_dir, monkeypatch):
+    monkeypatch.setattr(database_v2, '_BULK_CHUNK_SIZE', 2)
+
+    async def scenario(db):
+        trades = database_v2.TradesWrapper(db)
+        inserted = await trades.insert_many([
+            {'id': f't{i}', 'timestamp': f'2026-01-0{i + 1}T00:00:00', 'commodity': 'GOLD',
+             'type': 'BUY', 'status': 'OPEN', 'entry_price': 2000.0, 'quantity': 0.1}
+            for i in range(5)
+        ])
+        # Migration: vorhandene ids überspringen statt abzubrechen
+        await db.insert_trades([{'id': 't0', 'commodity': 'SILVER'}, {'id': 't5', 'status': 'OPEN'}],
+                               ignore_existing=True)
+        return inserted, await trades.count_documents({}), await trades.find_one({'id': 't0'})
+
+    inserted, count, first = _run(database_v2.TradesDatabase, scenario)
+    assert inserted == 5
+    assert count == 6
+    assert first['commodity'] == 'GOLD'
+
+
+def test_trades_insert_many_rolls_back_failed_chunk(db_dir):
+    async def scenario(db):
+        trades = database_v2.TradesWrapper(db)
+        await trades.insert_one({'id': 't1', 'status': 'OPEN'})
+        try:
+            await trades.insert_many([{'id': 't2', 'status': 'OPEN'}, {'id': 't1', 'status': 'OPEN'}])
+        except Exception:
+            pass
+        return await trades.count_documents({})
+
+    assert _run(database_v2.TradesDatabase, scenario) == 1
@@ -0,0 +1,80 @@
+"""
+Parität der Indikator-Kernels (backend/indicator_kernels.py) mit ta - für jedes
+verfügbare Backend (Numba bzw. reines Python, scipy)
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import EMAIndicator, MACD, SMAIndicator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import indicator_kernels  # noqa: E402
+
+_WINDOWS = (20, 20, 14, 12, 26, 9)
+_TOLERANCE = 1e-9
+
+_BACKENDS = [pytest.param(indicator_kernels.all_indicators, True,
+                          id='numba' if indicator_kernels.NUMBA_AVAILABLE else 'python')]
+if indicator_kernels.NUMBA_AVAILABLE:
+    _BACKENDS.append(pytest.param(indicator_kernels.all_indicators.py_func, True, id='python'))
+# all_indicators_np ist nur für lückenlose Reihen spezifiziert
+_BACKENDS.append(pytest.param(
+    getattr(indicator_kernels, 'all_indicators_np', None), False, id='scipy',
+    marks=pytest.mark.skipif(not indicator_kernels.SCIPY_AVAILABLE, reason='scipy nicht installiert')
+))
+
+
+def _reference(close: np.ndarray):
+    series = pd.Series(close)
+    macd = MACD(close=series)
+    return [indicator.to_numpy(dtype=np.float64) for indicator in (
+        SMAIndicator(close=series, window=20).sma_indicator(),
+        EMAIndicator(close=series, window=20).ema_indicator(),
+        RSIIndicator(close=series, window=14).rsi(),
+        macd.macd(),
+        macd.macd_signal(),
+        macd.macd_diff(),
+    )]
+
+
+def _series(n: int, with_nans: bool) -> np.ndarray:
+    rng = np.random.default_rng(n)
+    close = 100.0 + np.cumsum(rng.normal(0.0, 1.0, n))
+    if with_nans:
+        # Lücke am Anfang, mittendrin und am Ende
+        close[:min(2, n)] = np.nan
+        close[n // 2:n // 2 + 3] = np.nan
+        close[-1:] = np.nan
+    return close
+
+
+def _assert_matches(result, close):
+    for name, actual, expected in zip(('SMA', 'EMA', 'RSI', 'MACD', 'MACD_signal', 'MACD_histogram'),
+                                      result, _reference(close)):
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=_TOLERANCE, equal_nan=True,
+                                   err_msg=f"{name}, n={len(close)}")
+
+
+@pytest.mark.parametrize('with_nans', [False, True], ids=['no_nans', 'nans'])
+@pytest.mark.parametrize('all_indicators, supports_nans', _BACKENDS)
+def test_all_indicators_match_ta(all_indicators, supports_nans, with_nans):
+    if with_nans and not supports_nans:
+        pytest.skip('Backend nur für Reihen ohne NaN')
+    for n in range(1, 301):
+        close = _series(n, with_nans)
+        _assert_matches(all_indicators(close, *_WINDOWS), close)
+
+
+@pytest.mark.parametrize('with_nans', [False, True], ids=['no_nans', 'nans'])
+def test_single_kernels_match_ta(with_nans):
+    for n in range(1, 301):
+        close = _series(n, with_nans)
+        result = (indicator_kernels.sma(close, 20), indicator_kernels.ema(close, 20),
+                  indicator_kernels.rsi(close, 14), *indicator_kernels.macd(close, 12, 26, 9))
+        _assert_matches(result, close)